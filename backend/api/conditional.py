@@ -0,0 +1,54 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from api.representation import catalogue_versions, recipe_version
+
+
+def recipe_state(recipe):
+    """Все, от чего зависит представление рецепта для пользователя:
+    версия рецепта и флаги избранного, корзины и подписки."""
+
+    return (
+        *recipe_version(recipe),
+        bool(getattr(recipe, "is_favorited", False)),
+        bool(getattr(recipe, "is_in_shopping_cart", False)),
+        bool(getattr(recipe, "author_is_subscribed", False)),
+    )
+
+
+def recipes_etag(recipes, *extra, versions=None):
+    """ETag для рецептов. Учитывает версии справочников тегов
+    и ингредиентов, названия которых входят в ответ. versions -
+    результат catalogue_versions(), если view уже прочитал их."""
+
+    digest = md5(usedforsecurity=False)
+    for part in (
+        *(versions or catalogue_versions()),
+        *extra,
+        *(recipe_state(recipe) for recipe in recipes),
+    ):
+        digest.update(repr(part).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def not_modified(request, etag):
+    """Ответ 304 Not Modified, если ETag из If-None-Match совпадает.
+    Иначе None. If-Modified-Since не учитывается: флаги пользователя
+    и справочники меняются без изменения updated_at рецепта."""
+
+    return get_conditional_response(request, etag=etag)
+
+
+def set_conditional_headers(response, etag, last_modified=None):
+    """Заголовки ETag и Last-Modified (datetime) для ответа.
+    Ответ зависит от пользователя и всегда должен проверяться
+    клиентом заново (no-cache), а не браться из кэша по времени."""
+
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ("Authorization",))
+    return response
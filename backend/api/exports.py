@@ -0,0 +1,148 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from recipes.catalogue import get_tags
+from recipes.models import CompositionOfDish, Recipe
+
+# Количество рецептов, которые читаются из курсора и дополняются
+# тегами и составом блюда вместе: два запроса на пачку.
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_CSV_FIELDS = (
+    "id",
+    "author",
+    "name",
+    "text",
+    "cooking_time",
+    "pub_date",
+    "image",
+    "tags",
+    "ingredients",
+)
+
+
+def export_recipes(queryset, chunk_size=EXPORT_CHUNK_SIZE, image_url=None):
+    """Рецепты queryset словарями с тегами и составом блюда.
+    Рецепты читаются через iterator(chunk_size) (на PostgreSQL -
+    серверный курсор), поэтому память не зависит от размера каталога.
+    image_url строит ссылку на изображение по пути в хранилище."""
+
+    recipes = queryset.values(
+        "id",
+        "author_id",
+        "author__username",
+        "name",
+        "text",
+        "cooking_time",
+        "pub_date",
+        "image",
+    ).iterator(chunk_size=chunk_size)
+    chunk = []
+    for recipe in recipes:
+        chunk.append(recipe)
+        if len(chunk) >= chunk_size:
+            yield from export_chunk(chunk, image_url)
+            chunk = []
+    if chunk:
+        yield from export_chunk(chunk, image_url)
+
+
+def export_chunk(recipes, image_url=None):
+    """Дополняет пачку рецептов тегами и составом блюда."""
+
+    ids = [recipe["id"] for recipe in recipes]
+    tags = get_tags()
+    recipe_tags = defaultdict(list)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).values_list("recipe_id", "tag_id"):
+        if tag_id in tags:
+            recipe_tags[recipe_id].append(tags[tag_id])
+    compositions = defaultdict(list)
+    for composition in CompositionOfDish.objects.filter(
+        recipe_id__in=ids
+    ).values(
+        "recipe_id",
+        "ingredient_id",
+        "ingredient__name",
+        "ingredient__measurement_unit",
+        "amount",
+    ):
+        compositions[composition["recipe_id"]].append(
+            {
+                "id": composition["ingredient_id"],
+                "name": composition["ingredient__name"],
+                "measurement_unit": composition[
+                    "ingredient__measurement_unit"],
+                "amount": composition["amount"],
+            }
+        )
+    for recipe in recipes:
+        image = recipe["image"] and default_storage.url(recipe["image"])
+        if image and image_url:
+            image = image_url(image)
+        yield {
+            "id": recipe["id"],
+            "author": {
+                "id": recipe["author_id"],
+                "username": recipe["author__username"],
+            },
+            "name": recipe["name"],
+            "text": recipe["text"],
+            "cooking_time": recipe["cooking_time"],
+            "pub_date": recipe["pub_date"],
+            "image": image or None,
+            "tags": [
+                {"id": tag.id, "name": tag.name, "slug": tag.slug}
+                for tag in recipe_tags[recipe["id"]]
+            ],
+            "ingredients": compositions[recipe["id"]],
+        }
+
+
+def ndjson_lines(recipes):
+    """Строки NDJSON: один рецепт на строку."""
+
+    for recipe in recipes:
+        yield json.dumps(
+            recipe, ensure_ascii=False, cls=DjangoJSONEncoder) + "\n"
+
+
+class Echo:
+    """Файловый объект для csv.writer, который возвращает
+    записанную строку вместо записи в буфер."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(recipes):
+    """Строки CSV: один рецепт на строку, теги - слаги через запятую,
+    состав блюда - "название, количество единица" через точку с запятой."""
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_CSV_FIELDS)
+    for recipe in recipes:
+        yield writer.writerow(
+            (
+                recipe["id"],
+                recipe["author"]["username"],
+                recipe["name"],
+                recipe["text"],
+                recipe["cooking_time"],
+                recipe["pub_date"].isoformat(),
+                recipe["image"] or "",
+                ",".join(tag["slug"] for tag in recipe["tags"]),
+                "; ".join(
+                    f"{item['name']}, {item['amount']} "
+                    f"{item['measurement_unit']}"
+                    for item in recipe["ingredients"]
+                ),
+            )
+        )
+
+
+EXPORT_WRITERS = {"ndjson": ndjson_lines, "csv": csv_lines}
@@ -0,0 +1,71 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from recipes.images import IMAGE_UPLOAD_TTL, image_variant_urls
+from recipes.models import RecipeImageUpload
+
+# Ссылка на изображение, загруженное отдельно от рецепта:
+# "upload:<id>" вместо base64 в поле image.
+IMAGE_UPLOAD_PREFIX = "upload:"
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Абсолютные адреса уменьшенных копий изображения рецепта
+    (recipes.images) по имени копии: thumbnail, thumbnail_webp,
+    card_webp. Пока копии не готовы - пустой словарь."""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return absolute_urls(
+            image_variant_urls(recipe), self.context.get("request"))
+
+
+def absolute_urls(urls, request):
+    """Словарь адресов с абсолютными адресами, если есть запрос."""
+
+    if request is None:
+        return urls
+    return {
+        name: request.build_absolute_uri(url) for name, url in urls.items()
+    }
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение рецепта: base64-строка или ссылка "upload:<id>"
+    на изображение, загруженное текущим пользователем через
+    /api/recipes/upload_image/. Для ссылки возвращается
+    RecipeImageUpload (см. uploaded_image_name)."""
+
+    default_error_messages = {
+        "invalid_upload": "Загруженное изображение не найдено.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith(IMAGE_UPLOAD_PREFIX):
+            user = self.context.get("user") or getattr(
+                self.context.get("request"), "user", None)
+            try:
+                return RecipeImageUpload.objects.get(
+                    id=data[len(IMAGE_UPLOAD_PREFIX):],
+                    user_id=getattr(user, "id", None),
+                    created__gte=timezone.now() - IMAGE_UPLOAD_TTL,
+                )
+            except (RecipeImageUpload.DoesNotExist, DjangoValidationError):
+                self.fail("invalid_upload")
+        return super().to_internal_value(data)
+
+
+def uploaded_image_name(image):
+    """Значение для Recipe.image. Загруженное заранее изображение
+    уже лежит в хранилище и не копируется: рецепт получает его файл,
+    а ссылка удаляется и повторно не работает."""
+
+    if isinstance(image, RecipeImageUpload):
+        image.delete()
+        return image.image.name
+    return image
@@ -1,7 +1,14 @@
+from django.db.models import F
 from django_filters.rest_framework import FilterSet, filters
-from django_filters import ModelMultipleChoiceFilter, NumberFilter
+from django_filters import (
+    CharFilter,
+    ChoiceFilter,
+    ModelMultipleChoiceFilter,
+    NumberFilter,
+)
 
 from recipes.models import Ingredient, Tag, Recipe, User
+from recipes.search import search_recipes
 
 
 class FilterIngredient(FilterSet):
@@ -44,6 +51,12 @@ class FilterRecipe(FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(), to_field_name='slug'
     )
+    search = CharFilter(method='filter_search', label='search')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'popular'), ('trending', 'trending')),
+        method='filter_ordering',
+        label='ordering',
+    )
 
     class Meta:
         model = Recipe
@@ -54,3 +67,14 @@ class FilterRecipe(FilterSet):
         if not user.is_authenticated or int(value) == 0:
             return queryset
         return queryset.filter(**{name: user})
+
+    def filter_search(self, queryset, name, value):
+        """Поиск по названию и описанию рецепта (recipes.search)."""
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортировка по заранее посчитанному рейтингу RecipeRanking
+        (команда refresh_rankings). Рецепты без рейтинга - в конце."""
+        return queryset.order_by(
+            F(f'ranking__{value}').desc(nulls_last=True), '-pub_date', 'id'
+        )
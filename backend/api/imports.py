@@ -0,0 +1,171 @@
+import json
+
+from django.db import DatabaseError, connection, transaction
+
+from api.fields import uploaded_image_name
+from api.serializers import RecipeRecordSerializer
+from recipes.counters import change_counter
+from recipes.feed import drop_subscriber_feeds
+from recipes.images import enqueue_image_tasks
+from recipes.models import CompositionOfDish, Ingredient, Recipe, User
+from recipes.pantry import mark_recipes_changed
+
+# Количество строк NDJSON, которые проверяются и записываются вместе:
+# один запрос на ингредиенты пачки и одна транзакция на пачку.
+IMPORT_CHUNK_SIZE = 500
+
+
+def import_recipes(lines, author, chunk_size=IMPORT_CHUNK_SIZE,
+                   context=None):
+    """Импорт рецептов автора author из строк NDJSON (str или bytes),
+    по одному рецепту в формате RecipeRecordSerializer на строку.
+    Строки с ошибками пропускаются и попадают в отчет
+    {"created": [{"line", "id"}], "errors": [{"line", "errors"}]}."""
+
+    report = {"created": [], "errors": []}
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if not line.strip():
+                continue
+            chunk.append((number, json.loads(line)))
+        except ValueError as error:
+            report["errors"].append(
+                {"line": number, "errors": {
+                    "non_field_errors": [f"Некорректная строка: {error}"]}}
+            )
+            continue
+        if len(chunk) >= chunk_size:
+            import_chunk(chunk, author, report, context)
+            chunk = []
+    if chunk:
+        import_chunk(chunk, author, report, context)
+    report["errors"].sort(key=lambda item: item["line"])
+    return report
+
+
+def chunk_ingredient_ids(chunk):
+    """id ингредиентов всех рецептов пачки (некорректные пропускаются,
+    их найдет проверка сериализатора)."""
+
+    ids = set()
+    for _, data in chunk:
+        ingredients = data.get("ingredients") if isinstance(
+            data, dict) else None
+        for item in ingredients if isinstance(ingredients, list) else ():
+            try:
+                ids.add(int(item["id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    return ids
+
+
+def import_chunk(chunk, author, report, context=None):
+    """Проверяет пачку строк [(номер, данные)] и записывает
+    прошедшие проверку рецепты."""
+
+    context = {
+        "user": author,
+        **(context or {}),
+        "ingredients": Ingredient.objects.in_bulk(chunk_ingredient_ids(chunk)),
+    }
+    valid = []
+    for number, data in chunk:
+        if not isinstance(data, dict):
+            report["errors"].append(
+                {"line": number, "errors": {
+                    "non_field_errors": ["Ожидается объект рецепта."]}}
+            )
+            continue
+        serializer = RecipeRecordSerializer(data=data, context=context)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            report["errors"].append(
+                {"line": number, "errors": serializer.errors})
+    if not valid:
+        return
+    try:
+        recipes = create_recipes(
+            [validated_data for _, validated_data in valid], author)
+    except DatabaseError:
+        # Пачка пишется одной транзакцией и откатывается целиком:
+        # строки повторяются по одной, каждая в своей точке сохранения,
+        # и в отчет попадают только те, что не записались.
+        for number, validated_data in valid:
+            import_row(number, validated_data, author, report)
+        return
+    report["created"].extend(
+        {"line": number, "id": recipe.id}
+        for (number, _), recipe in zip(valid, recipes)
+    )
+
+
+def import_row(number, validated_data, author, report):
+    """Записывает один рецепт пачки, откатившейся с ошибкой базы."""
+
+    try:
+        (recipe,) = create_recipes([validated_data], author)
+    except DatabaseError as error:
+        report["errors"].append(
+            {"line": number, "errors": {
+                "non_field_errors": [f"Ошибка записи в базу: {error}"]}}
+        )
+        return
+    report["created"].append({"line": number, "id": recipe.id})
+
+
+def bulk_insert_returns_ids():
+    """Заполняет ли bulk_create id созданных объектов (PostgreSQL)."""
+
+    return connection.features.can_return_rows_from_bulk_insert
+
+
+@transaction.atomic
+def create_recipes(recipes_data, author):
+    """Создает рецепты тремя bulk_create: рецепты, теги, состав блюда.
+    bulk_create не отправляет сигналы, поэтому счетчик рецептов автора,
+    индекс "что приготовить", ленты подписчиков и задания на копии
+    изображений обновляются явно.
+    Если база не возвращает id из bulk_create (SQLite), рецепты
+    сохраняются по одному через save(), и то же делают сигналы.
+    Новые рецепты еще не лежат в корзинах, их версии не меняются."""
+
+    recipes = [
+        Recipe(
+            author=author,
+            name=data["name"],
+            image=uploaded_image_name(data["image"]),
+            text=data["text"],
+            cooking_time=data["cooking_time"],
+        )
+        for data in recipes_data
+    ]
+    bulk = bulk_insert_returns_ids()
+    if bulk:
+        Recipe.objects.bulk_create(recipes)
+    else:
+        for recipe in recipes:
+            recipe.save()
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe, data in zip(recipes, recipes_data)
+        for tag in data["tags"]
+    )
+    CompositionOfDish.objects.bulk_create(
+        CompositionOfDish(
+            recipe=recipe,
+            ingredient=ingredient["ingredient"],
+            amount=ingredient["amount"],
+        )
+        for recipe, data in zip(recipes, recipes_data)
+        for ingredient in data["ingredients"]
+    )
+    if bulk:
+        change_counter(User, author.id, "recipes_count", len(recipes))
+        mark_recipes_changed([recipe.id for recipe in recipes])
+        enqueue_image_tasks(recipes)
+        transaction.on_commit(lambda: drop_subscriber_feeds([author.id]))
+    return recipes
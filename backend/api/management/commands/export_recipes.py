@@ -0,0 +1,74 @@
+import sys
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_WRITERS, export_recipes
+from recipes.models import Recipe, User
+
+# Списки пользователя, которые можно выгрузить вместо всего каталога.
+USER_LISTS = {"favorites": "favorites__user", "cart": "shoppingcart__user"}
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'export_recipes' выгружает рецепты
+    с тегами и составом блюда в NDJSON или CSV: весь каталог или
+    избранное/корзину пользователя (--user, --list). Рецепты читаются
+    из базы пачками (api.exports) и сразу пишутся в файл."""
+
+    help = "Выгрузка рецептов в NDJSON/CSV файл."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Путь к файлу или '-' для стандартного вывода.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_WRITERS),
+            default="ndjson",
+            help="Формат файла.",
+        )
+        parser.add_argument(
+            "--user",
+            help="Email пользователя, чей список выгружается.",
+        )
+        parser.add_argument(
+            "--list",
+            choices=sorted(USER_LISTS),
+            default="favorites",
+            help="Список пользователя: избранное или корзина.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Количество рецептов, читаемых из базы за раз.",
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля.")
+        recipes = Recipe.objects.all()
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f"Пользователь {options['user']} не найден.")
+            recipes = recipes.filter(**{USER_LISTS[options["list"]]: user})
+        lines = EXPORT_WRITERS[options["format"]](
+            export_recipes(recipes, options["chunk_size"]))
+        try:
+            if options["output"] == "-":
+                sys.stdout.writelines(lines)
+            else:
+                with open(options["output"], "w", encoding="utf-8",
+                          newline="") as file:
+                    file.writelines(lines)
+        except OSError as error:
+            raise CommandError(
+                f"Ошибка при записи файла: {error}") from error
+        if options["output"] != "-":
+            self.stdout.write(self.style.SUCCESS("Рецепты выгружены."))
@@ -0,0 +1,61 @@
+import sys
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import IMPORT_CHUNK_SIZE, import_recipes
+from recipes.models import User
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'import_recipes' загружает рецепты автора
+    из файла NDJSON: один рецепт в формате POST /api/recipes/ на строку.
+    Файл читается потоком, рецепты проверяются и вставляются пачками
+    (api.imports). Строки с ошибками пропускаются и выводятся в отчете."""
+
+    help = "Массовый импорт рецептов из NDJSON файла."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file",
+            help="Путь к файлу NDJSON или '-' для стандартного ввода.",
+        )
+        parser.add_argument(
+            "--author",
+            required=True,
+            help="Email автора импортируемых рецептов.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help="Количество рецептов в одной пачке.",
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля.")
+        try:
+            author = User.objects.get(email=options["author"])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"Пользователь {options['author']} не найден.")
+        try:
+            if options["file"] == "-":
+                report = import_recipes(
+                    sys.stdin, author, options["chunk_size"])
+            else:
+                with open(options["file"], encoding="utf-8") as file:
+                    report = import_recipes(
+                        file, author, options["chunk_size"])
+        except OSError as error:
+            raise CommandError(
+                f"Ошибка при чтении файла: {error}") from error
+        for error in report["errors"]:
+            self.stderr.write(f"Строка {error['line']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Добавлено рецептов: {len(report['created'])}, "
+                f"строк с ошибками: {len(report['errors'])}."
+            )
+        )
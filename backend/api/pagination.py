@@ -1,12 +1,289 @@
+import json
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from core.constants import LenghtField
 
+# Время жизни посчитанного количества объектов для одного набора
+# фильтров, секунды.
+COUNT_CACHE_TIMEOUT = 60
+# Выше этой оценки планировщика PostgreSQL точный COUNT(*) не считается.
+COUNT_ESTIMATE_THRESHOLD = 100000
+# Оценка количества строк в первой строке плана EXPLAIN.
+PLAN_ROWS_RE = re.compile(r"\brows=(\d+)")
+
+
+class CountedPage(Page):
+    """Страница, про которую точно известно, есть ли следующая."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = has_next
+
+    def has_next(self):
+        return self.next_exists
+
+
+class CountingPaginator(Paginator):
+    """Пагинатор с приблизительным количеством объектов.
+    Количество кэшируется на COUNT_CACHE_TIMEOUT по SQL запроса
+    (фильтры и пользователь входят в SQL). На PostgreSQL при оценке
+    планировщика больше COUNT_ESTIMATE_THRESHOLD берется оценка.
+    Страницы и ссылка next от count не зависят: страница читается
+    с одной лишней строкой, поэтому устаревшее или приблизительное
+    количество не прячет последние страницы."""
+
+    cache_timeout = COUNT_CACHE_TIMEOUT
+    estimate_threshold = COUNT_ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return len(self.object_list)
+        sql, params = self.object_list.query.sql_with_params()
+        key = "pagination_count:" + md5(
+            repr((sql, params)).encode(), usedforsecurity=False
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate_count()
+            if count is None or count < self.estimate_threshold:
+                count = self.object_list.count()
+            cache.set(key, count, self.cache_timeout)
+        return count
+
+    def estimate_count(self):
+        """Оценка количества строк планировщиком PostgreSQL или None."""
+
+        if connections[self.object_list.db].vendor != "postgresql":
+            return None
+        match = PLAN_ROWS_RE.search(self.explain())
+        return int(match.group(1)) if match else None
+
+    def explain(self):
+        """Первая строка текстового плана запроса (EXPLAIN без ANALYZE):
+        "Seq Scan on ... (cost=... rows=N width=...)". QuerySet.explain
+        не подходит: на Django 3.2 с psycopg2 format="json" возвращает
+        repr списка Python, а не JSON."""
+
+        sql, params = self.object_list.query.sql_with_params()
+        with connections[self.object_list.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return str(cursor.fetchone()[0])
+
+    def validate_number(self, number):
+        """Номер страницы не ограничивается сверху по count."""
+
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return CountedPage(
+            objects[:self.per_page],
+            number,
+            self,
+            len(objects) > self.per_page,
+        )
+
 
 class PaginationCust(PageNumberPagination):
     """Кастомная пагинация.
     page - номер страницы(integer).
-    limit- количество объектов на странице(integer)."""
+    limit- количество объектов на странице(integer).
+    cursor - постраничный вывод по ключу (keyset) вместо номера
+    страницы, если у пагинации задан keyset_ordering. Первая страница
+    запрашивается с пустым cursor, следующая - по ссылке next.
+    Без COUNT(*) и OFFSET: любая страница стоит как первая.
+    count при пагинации по номеру страницы приблизительный
+    (CountingPaginator)."""
 
+    django_paginator_class = CountingPaginator
     page_size_query_param = "limit"
     page_size = LenghtField.PAGE_SIZE.value
+    cursor_query_param = "cursor"
+    # Поля сортировки для пагинации по ключу. Последнее поле
+    # должно быть уникальным, например ("-pub_date", "id").
+    keyset_ordering = ()
+    # Пагинация по ключу и без параметра cursor.
+    keyset_by_default = False
+    # Параметры запроса, которые задают свою сортировку: с ними
+    # пагинация по ключу keyset_ordering перепутала бы порядок,
+    # поэтому вместе с cursor они отклоняются.
+    keyset_conflicting_params = ()
+    invalid_cursor_message = "Некорректный курсор."
+    conflicting_param_message = "Не используется вместе с cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = bool(
+            self.keyset_ordering
+            and (
+                self.keyset_by_default
+                or self.cursor_query_param in request.query_params
+            )
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.check_conflicting_params(request)
+        page_size = self.get_page_size(request)
+        position = self.get_position(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = [
+                getattr(page[-1], field.lstrip("-"))
+                for field in self.keyset_ordering
+            ]
+        return page
+
+    def check_conflicting_params(self, request):
+        """400, если вместе с cursor задана другая сортировка."""
+
+        conflicts = [
+            param
+            for param in self.keyset_conflicting_params
+            if request.query_params.get(param)
+        ]
+        if conflicts:
+            raise exceptions.ValidationError(
+                {
+                    param: [self.conflicting_param_message]
+                    for param in conflicts
+                }
+            )
+
+    def get_position(self, request):
+        """Позиция курсора из запроса или None для первой страницы."""
+
+        return self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, ""))
+
+    def keyset_filter(self, position):
+        """Условие "после позиции" для сортировки keyset_ordering:
+        (a < x) OR (a = x AND b > y) OR ... для каждого поля."""
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.keyset_ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, position):
+        data = json.dumps(
+            [
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in position
+            ]
+        )
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Позиция из курсора или None для первой страницы."""
+
+        if not cursor:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list)
+            or len(position) != len(self.keyset_ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @property
+    def count(self):
+        """Количество объектов или None при пагинации по ключу."""
+
+        return None if self.keyset else self.page.paginator.count
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            remove_query_param(
+                self.request.build_absolute_uri(), self.page_query_param
+            ),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class RecipePagination(PaginationCust):
+    """Рецепты: от новых к старым, по ключу (pub_date, id)."""
+
+    keyset_ordering = ("-pub_date", "id")
+    keyset_conflicting_params = ("ordering", "search")
+
+
+class SubscriptionsPagination(PaginationCust):
+    """Подписки: от новых к старым, по ключу subscription_id."""
+
+    keyset_ordering = ("-subscription_id",)
+
+
+class FeedPagination(RecipePagination):
+    """Лента подписок: всегда по ключу (pub_date, id)."""
+
+    keyset_by_default = True
+    # Фильтры и сортировка рецептов к ленте не применяются.
+    keyset_conflicting_params = ()
@@ -4,7 +4,7 @@ from rest_framework import permissions
 class IsAdminOrReadOnly(permissions.BasePermission):
     """Действие может выполнять строго только админ."""
 
-    def has_permission(self, request, view, obj):
+    def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
                 or request.user.is_admin)
 
@@ -24,3 +24,14 @@ class IsAuthorOrAdminOrIsAuthReadOnly(permissions.BasePermission):
             or obj.author == request.user
             or request.user.is_superuser
         )
+
+
+class CanImportRecipes(permissions.BasePermission):
+    """Массовый импорт рецептов: админ или партнер
+    с правом recipes.import_recipes."""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_staff
+            or request.user.has_perm("recipes.import_recipes")
+        )
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from recipes.shopping_list import (
+    format_shopping_list,
+    render_shopping_list_pdf,
+)
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+    Список покупок - это список словарей name, measurement_unit, amount.
+    Ошибки DRF (словарь) выводятся строками "поле: текст"."""
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return self.render_lines(
+                f"{key}: {value}" for key, value in data.items()
+            )
+        return self.render_list(data)
+
+    def render_lines(self, lines):
+        return "".join(f"{line}\n" for line in lines).encode(self.charset)
+
+    def render_list(self, buy_list):
+        return self.render_lines(
+            format_shopping_list(
+                {
+                    "name": item["name"],
+                    "measurement_unit": item["measurement_unit"],
+                    "total_amount": item["amount"],
+                }
+                for item in buy_list
+            )
+        )
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Список покупок простым текстом."""
+
+    media_type = "text/plain"
+    format = "txt"
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Список покупок в CSV: name, measurement_unit, amount."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def render_list(self, buy_list):
+        output = io.StringIO()
+        writer = csv.DictWriter(
+            output, fieldnames=("name", "measurement_unit", "amount")
+        )
+        writer.writeheader()
+        writer.writerows(buy_list)
+        return output.getvalue().encode(self.charset)
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """Список покупок в PDF. Готовый файл списка покупок view отдает
+    сам из кэша, через рендерер проходят только ответы с ошибками."""
+
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+    render_style = "binary"
+
+    def render_lines(self, lines):
+        output = io.BytesIO()
+        render_shopping_list_pdf(lines, output)
+        return output.getvalue()
+
+
+# Форматы выгрузки списка покупок. Первый - формат по умолчанию.
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListPDFRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListTextRenderer,
+    JSONRenderer,
+)
+
+
+class RecipeExportNDJSONRenderer(BaseRenderer):
+    """Выгрузка рецептов в NDJSON. Рецепты view отдает потоком сам,
+    через рендерер проходят только ответы с ошибками."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode(
+            self.charset)
+
+
+class RecipeExportCSVRenderer(BaseRenderer):
+    """Выгрузка рецептов в CSV. Рецепты view отдает потоком сам,
+    через рендерер проходят только ответы с ошибками: словарь ошибок
+    DRF выводится строками "поле: текст"."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        lines = (
+            (f"{key}: {value}" for key, value in data.items())
+            if isinstance(data, dict)
+            else (str(data),)
+        )
+        return "".join(f"{line}\n" for line in lines).encode(self.charset)
+
+
+# Форматы выгрузки рецептов. Первый - формат по умолчанию.
+RECIPE_EXPORT_RENDERERS = (
+    RecipeExportNDJSONRenderer,
+    RecipeExportCSVRenderer,
+)
@@ -0,0 +1,46 @@
+from recipes.catalogue import (
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    LRUCache,
+    get_catalogue_version,
+)
+
+# Максимальное количество представлений рецептов в кэше одного процесса.
+RECIPE_CACHE_SIZE = 4096
+
+# Общая для всех пользователей часть представления рецепта
+# (RecipeReadSerializer без флагов пользователя), по recipe_cache_key.
+recipe_representations = LRUCache(RECIPE_CACHE_SIZE)
+
+
+def recipe_version(recipe):
+    """Все, от чего зависит общая часть представления рецепта:
+    время изменения рецепта и данные профиля автора."""
+
+    author = recipe.author
+    return (
+        recipe.id,
+        recipe.updated_at.isoformat(),
+        author.id,
+        author.email,
+        author.username,
+        author.first_name,
+        author.last_name,
+    )
+
+
+def catalogue_versions():
+    """Версии справочников тегов и ингредиентов, названия из которых
+    входят в представление рецепта."""
+
+    return (
+        get_catalogue_version(TAGS_VERSION_KEY),
+        get_catalogue_version(INGREDIENTS_VERSION_KEY),
+    )
+
+
+def recipe_cache_key(recipe, versions=None):
+    """Ключ представления рецепта. versions - результат
+    catalogue_versions(), прочитанный один раз для всей страницы."""
+
+    return (recipe_version(recipe), *(versions or catalogue_versions()))
@@ -1,20 +1,41 @@
-from django.db.models import F
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.functional import cached_property
 from django.forms import ValidationError
 from rest_framework import serializers
 from rest_framework.fields import IntegerField, SerializerMethodField
 from rest_framework.relations import PrimaryKeyRelatedField
 from drf_extra_fields.fields import Base64ImageField
 
+from api.fields import (
+    IMAGE_UPLOAD_PREFIX,
+    ImageVariantsField,
+    RecipeImageField,
+    absolute_urls,
+    uploaded_image_name,
+)
+from api.representation import (
+    catalogue_versions,
+    recipe_cache_key,
+    recipe_representations,
+)
 from core.constants import LenghtField
 from recipes.models import (
     CompositionOfDish,
     Ingredient,
     Favorite,
     Recipe,
+    RecipeImageUpload,
+    RecipeQuerySet,
     ShoppingCart,
+    ShoppingListExport,
     Tag,
 )
+from recipes.catalogue import get_tags
+from recipes.images import IMAGE_UPLOAD_MAX_SIZE, image_variant_urls
+from recipes.pantry import mark_recipes_changed
+from recipes.shopping_list import bump_recipe_cart_versions
 from users.serializers import MyUserSerializer
 
 
@@ -45,6 +66,32 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("__all__",)
 
 
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """Список рецептов. Теги и состав блюда загружаются одним
+    prefetch только для рецептов, которых нет в кэше представлений.
+    Версии справочников читаются один раз на страницу (или берутся
+    из context["catalogue_versions"], если их прочитал view), ключи
+    кэша передаются рецептам через context["recipe_cache_keys"]."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, "all") else data)
+        versions = (
+            self.context.get("catalogue_versions") or catalogue_versions())
+        keys = {
+            recipe.id: recipe_cache_key(recipe, versions)
+            for recipe in recipes
+        }
+        self.context["recipe_cache_keys"] = keys
+        prefetch_related_objects(
+            [
+                recipe for recipe in recipes
+                if recipe_representations.get(keys[recipe.id]) is None
+            ],
+            *RecipeQuerySet.related_prefetches(),
+        )
+        return super().to_representation(recipes)
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Сериализатор для получения Рецептов
     и связанных с ним списка покупок и избранного.Только чтение."""
@@ -54,6 +101,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     # author = UserSerializer(read_only=True)
     ingredients = SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     cooking_time = serializers.IntegerField(
@@ -73,6 +121,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
+        list_serializer_class = RecipeReadListSerializer
         fields = (
             "id",
             "tags",
@@ -82,6 +131,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
@@ -91,18 +141,76 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_ingredients(self, obj):
-        """Получает список ингридиентов для рецепта."""
-        recipe = obj
-        ingredients = recipe.ingredients.values(
-            "id",
-            "name",
-            "measurement_unit",
-            amount=F("compositionofdish__amount"),
-        )
-        return ingredients
+        """Получает список ингридиентов для рецепта.
+        Читает состав блюда из composition_list, поэтому при
+        prefetch сериализатора (RecipeQuerySet.related_prefetches)
+        не делает запросов на рецепт."""
+        return [
+            {
+                "id": composition.ingredient.id,
+                "name": composition.ingredient.name,
+                "measurement_unit": composition.ingredient.measurement_unit,
+                "amount": composition.amount,
+            }
+            for composition in obj.composition_list.all()
+        ]
+
+    def to_representation(self, instance):
+        """Общая для всех пользователей часть представления берется
+        из кэша процесса (api.representation), поверх нее ставятся
+        флаги текущего пользователя и абсолютные адреса картинки
+        и ее уменьшенных копий."""
+        is_subscribed = getattr(instance, "author_is_subscribed", None)
+        if is_subscribed is None:
+            is_subscribed = MyUserSerializer(
+                context=self.context).get_is_subscribed(instance.author)
+        key = self.context.get("recipe_cache_keys", {}).get(
+            instance.id) or recipe_cache_key(
+                instance, self.context.get("catalogue_versions"))
+        data = recipe_representations.get(key)
+        if data is None:
+            data = self.shared_representation(instance)
+            recipe_representations.set(key, data)
+        request = self.context.get("request")
+        image = data["image"]
+        if image and request is not None:
+            image = request.build_absolute_uri(image)
+        return {
+            **data,
+            "author": {**data["author"], "is_subscribed": is_subscribed},
+            "is_favorited": self.get_is_favorited(instance),
+            "is_in_shopping_cart": self.get_is_in_shopping_cart(instance),
+            "image": image,
+            "image_variants": absolute_urls(data["image_variants"], request),
+        }
+
+    def shared_representation(self, instance):
+        """Представление рецепта без учета пользователя и адреса сайта.
+        Теги и состав блюда догружаются, если их нет в prefetch.
+        Подписка на автора здесь не проверяется (context["is_subscribed"]):
+        ее ставит to_representation для текущего пользователя."""
+        if "composition_list" not in getattr(
+            instance, "_prefetched_objects_cache", {}
+        ):
+            prefetch_related_objects(
+                [instance], *RecipeQuerySet.related_prefetches())
+        data = super(RecipeReadSerializer, self.shared_serializer
+                     ).to_representation(instance)
+        data["image"] = instance.image.url if instance.image else None
+        data["image_variants"] = image_variant_urls(instance)
+        return data
+
+    @cached_property
+    def shared_serializer(self):
+        """Копия сериализатора для общей части представления.
+        Одна на страницу: у списка рецептов один дочерний сериализатор."""
+        return type(self)(context={**self.context, "is_subscribed": False})
 
     def get_is_favorited(self, recipe):
         """Проверка - находится ли рецепт в избранном."""
+        is_favorited = getattr(recipe, "is_favorited", None)
+        if is_favorited is not None:
+            return is_favorited
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -110,12 +218,25 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, recipe):
         """Проверка - находится ли рецепт в списке  покупок."""
+        is_in_shopping_cart = getattr(recipe, "is_in_shopping_cart", None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
         return ShoppingCart.objects.filter(user=user, recipe=recipe).exists()
 
 
+class PantryRecipeSerializer(RecipeReadSerializer):
+    """Рецепт в поиске "что приготовить" с количеством
+    недостающих ингредиентов (атрибут missing_ingredients)."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["missing_ingredients"] = instance.missing_ingredients
+        return data
+
+
 class CompositionOfDishRecordSerializer(serializers.ModelSerializer):
     """Сериализатор для получения Сотава блюда."""
 
@@ -129,19 +250,34 @@ class CompositionOfDishRecordSerializer(serializers.ModelSerializer):
         )
 
 
+class CatalogueTagField(PrimaryKeyRelatedField):
+    """Тег по id из кэша справочника тегов, без запроса к базе."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            tag = get_tags().get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if tag is None:
+            self.fail("does_not_exist", pk_value=data)
+        return tag
+
+
 class RecipeRecordSerializer(serializers.ModelSerializer):
     """Сериализатор для получения Рецептов
     и связанных с ним списка покупок и избранного.Запись.
     У одого рецепта может быть несолько связанных тегов(набор)."""
 
     id = IntegerField(read_only=True)
-    tags = PrimaryKeyRelatedField(
+    tags = CatalogueTagField(
         queryset=Tag.objects.all(),
         many=True,
     )
     author = MyUserSerializer(read_only=True)
     ingredients = CompositionOfDishRecordSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     cooking_time = serializers.IntegerField(
         validators=[
             MinValueValidator(
@@ -203,6 +339,24 @@ class RecipeRecordSerializer(serializers.ModelSerializer):
                  "Ингредиенты не могут дублироваться."}
             )
 
+        # Проверка на несуществующие ингредиенты: один запрос на все id,
+        # найденные ингредиенты сразу подставляются в состав блюда.
+        # При массовом импорте ингредиенты всей пачки рецептов
+        # уже найдены и переданы в context["ingredients"].
+        found = self.context.get("ingredients")
+        if found is None:
+            found = Ingredient.objects.in_bulk(ingredient_ids)
+        unknown = [pk for pk in ingredient_ids if pk not in found]
+        if unknown:
+            raise serializers.ValidationError(
+                {
+                    "ingredients": f"Такого ингредиента id="
+                    f"{', '.join(map(str, unknown))} не существует!"
+                }
+            )
+        for ingredient in ingredients:
+            ingredient["ingredient"] = found[ingredient["id"]]
+
         # Дополнительная проверка ингредиентов на минимальное количество.
         if len(ingredients) < 1:
             raise ValidationError(
@@ -227,60 +381,82 @@ class RecipeRecordSerializer(serializers.ModelSerializer):
         """Cоздание связей между ингредиентами и рецептом.
         Входные параметры данной функции включают список
         ингредиентов (ingredients) и рецепт (recipe)."""
-        compositions = []
-        for ingredient in ingredients:
-            composition = CompositionOfDish(
-                ingredient=Ingredient.objects.get(id=ingredient["id"]),
+        CompositionOfDish.objects.bulk_create(
+            CompositionOfDish(
+                ingredient=ingredient["ingredient"],
                 recipe=recipe,
                 amount=ingredient["amount"],
             )
-            compositions.append(composition)
-        CompositionOfDish.objects.bulk_create(compositions)
-
+            for ingredient in ingredients
+        )
+        self.composition_of_dish_changed(recipe)
+
+    def update_composition_of_dish(self, ingredients, recipe):
+        """Обновление состава блюда по разнице со строками в базе:
+        удаляются только убранные ингредиенты, количество меняется
+        одним bulk_update, новые добавляются одним bulk_create."""
+        existing = {
+            composition.ingredient_id: composition
+            for composition in recipe.composition_list.all()
+        }
+        changed = []
+        created = []
+        for ingredient in ingredients:
+            composition = existing.pop(ingredient["id"], None)
+            if composition is None:
+                created.append(
+                    CompositionOfDish(
+                        ingredient=ingredient["ingredient"],
+                        recipe=recipe,
+                        amount=ingredient["amount"],
+                    )
+                )
+            elif composition.amount != ingredient["amount"]:
+                composition.amount = ingredient["amount"]
+                changed.append(composition)
+        if existing:
+            CompositionOfDish.objects.filter(
+                id__in=[composition.id for composition in existing.values()]
+            ).delete()
+        if changed:
+            CompositionOfDish.objects.bulk_update(changed, ["amount"])
+        if created:
+            CompositionOfDish.objects.bulk_create(created)
+        if changed or created:
+            self.composition_of_dish_changed(recipe)
+
+    def composition_of_dish_changed(self, recipe):
+        # bulk_create и bulk_update не отправляют сигналы, поэтому списки
+        # покупок с этим рецептом и индекс "что приготовить"
+        # обновляются явно.
+        bump_recipe_cart_versions([recipe.id])
+        mark_recipes_changed([recipe.id])
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта с указанными полями.
         Получаем данные о тегах и ингредиентах.
-        Создаем рецепт и связываем с тегом."""
+        Создаем рецепт и связываем с тегом.
+        Ингредиенты уже проверены и найдены в validate."""
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients", [])
-        # Проверка на несуществующий ингредиент в рецепте
-        for ingredient in ingredients:
-            ingredient = ingredient["id"]
-            try:
-                Ingredient.objects.get(id=ingredient)
-            except Ingredient.DoesNotExist:
-                raise serializers.ValidationError(
-                    {
-                        "Ingredients": f"Такого ингредиента id="
-                        f"{ingredient} не существует!"
-                    }
-                )
-        # Проверка что мы будем создавать рецепт с ингредиентом
+        validated_data["image"] = uploaded_image_name(validated_data["image"])
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_composition_of_dish(
             recipe=recipe, ingredients=ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновление рецепта."""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
-        # Проверка на несуществующий ингредиент в рецепте
-        for ingredient in ingredients:
-            ingredient = ingredient["id"]
-            try:
-                Ingredient.objects.get(id=ingredient)
-            except Ingredient.DoesNotExist:
-                raise serializers.ValidationError(
-                    {
-                        "Ingredients": f"Такого ингредиента id="
-                        f"{ingredient} не существует!"
-                    }
-                )
+        if "image" in validated_data:
+            validated_data["image"] = uploaded_image_name(
+                validated_data["image"])
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_composition_of_dish(
+        self.update_composition_of_dish(
             recipe=instance, ingredients=ingredients)
         return super().update(instance, validated_data)
 
@@ -309,6 +485,7 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     передавать изображения в виде base64-строки по API."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -316,5 +493,53 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         )
+
+
+class RecipeImageUploadSerializer(serializers.ModelSerializer):
+    """Изображение рецепта, загруженное отдельно от рецепта.
+    handle передается в поле image рецепта вместо base64."""
+
+    handle = SerializerMethodField()
+
+    class Meta:
+        model = RecipeImageUpload
+        fields = (
+            "id",
+            "handle",
+            "image",
+            "created",
+        )
+        read_only_fields = ("id", "created")
+
+    def get_handle(self, upload):
+        return f"{IMAGE_UPLOAD_PREFIX}{upload.id}"
+
+    def validate_image(self, image):
+        if image.size > IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Размер изображения не должен превышать "
+                f"{IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ."
+            )
+        return image
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    """Сериализатор задания на выгрузку списка покупок.
+    Ссылка на файл появляется, когда задание выполнено."""
+
+    file = serializers.FileField(read_only=True, use_url=True)
+
+    class Meta:
+        model = ShoppingListExport
+        fields = (
+            "id",
+            "status",
+            "file",
+            "error",
+            "created",
+            "finished",
+        )
+        read_only_fields = fields
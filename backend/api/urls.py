@@ -1,7 +1,12 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import TagViewSet, IngredientViewSet, RecipeViewSet
+from api.views import (
+    TagViewSet,
+    IngredientViewSet,
+    RecipeViewSet,
+    ShoppingListExportViewSet,
+)
 from users.views import CustomUserViewSet
 
 app_name = "api"
@@ -13,6 +18,11 @@ router.register("users", CustomUserViewSet, "users")
 router.register("tags", TagViewSet, "tags")
 router.register("ingredients", IngredientViewSet, "ingredients")
 router.register("recipes", RecipeViewSet, "recipes")
+router.register(
+    "shopping_list_exports",
+    ShoppingListExportViewSet,
+    "shopping_list_exports",
+)
 
 
 urlpatterns = [
@@ -1,40 +1,66 @@
-import io
-
-from django.db.models import Sum
 from django.db.utils import IntegrityError
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from rest_framework.exceptions import PermissionDenied
-from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework import mixins, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FileUploadParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.viewsets import (
+    GenericViewSet,
+    ModelViewSet,
+    ReadOnlyModelViewSet,
+)
 
+from api.conditional import (
+    not_modified,
+    recipes_etag,
+    set_conditional_headers,
+)
+from api.exports import EXPORT_WRITERS, export_recipes
 from api.filters import FilterIngredient, FilterRecipe
-from api.pagination import PaginationCust
-from api.permissions import IsAuthorOrAdminOrIsAuthReadOnly
+from api.imports import import_recipes
+from api.pagination import (
+    FeedPagination,
+    PaginationCust,
+    RecipePagination,
+)
+from api.permissions import CanImportRecipes, IsAuthorOrAdminOrIsAuthReadOnly
+from api.renderers import (
+    RECIPE_EXPORT_RENDERERS,
+    SHOPPING_LIST_RENDERERS,
+)
+from api.representation import catalogue_versions
 from api.serializers import (
     TagSerializer,
     IngredientSerializer,
+    PantryRecipeSerializer,
+    RecipeImageUploadSerializer,
     RecipeReadSerializer,
     RecipeRecordSerializer,
     ShortRecipeSerializer,
+    ShoppingListExportSerializer,
 )
 
-# from core
+from core.constants import LenghtField
+from recipes.catalogue import (
+    get_ingredient_index,
+    ingredients_cache,
+    tags_cache,
+)
+from recipes.feed import feed_filter, feed_page_ids
 from recipes.models import (
-    CompositionOfDish,
     Ingredient,
     Tag,
     Recipe,
     Favorite,
     ShoppingCart,
+    ShoppingListExport,
 )
+from recipes.pantry import search_pantry
+from recipes.shopping_list import get_shopping_list, get_shopping_list_pdf
 
 
 class TagViewSet(ReadOnlyModelViewSet):
@@ -45,10 +71,25 @@ class TagViewSet(ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов из кэша справочника процесса."""
+
+        return Response(tags_cache.get_or_set(
+            "list", lambda: super(TagViewSet, self).list(request).data))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Тег из кэша справочника процесса."""
+
+        return Response(tags_cache.get_or_set(
+            ("detail", kwargs["pk"]),
+            lambda: super(TagViewSet, self).retrieve(request, **kwargs).data,
+        ))
+
 
 class IngredientViewSet(ReadOnlyModelViewSet):
-    """Работа с Тегами. Получить список всех тегов.
-    Изменение и создание тэгов разрешено только админам."""
+    """Работа с Ингредиентами. Получить список всех ингредиентов
+    и подсказки для автодополнения.
+    Изменение и создание ингредиентов разрешено только админам."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -56,6 +97,42 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = FilterIngredient
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов из кэша справочника процесса.
+        Ключ кэша - параметры фильтрации запроса."""
+
+        return Response(ingredients_cache.get_or_set(
+            ("list", request.query_params.urlencode()),
+            lambda: super(IngredientViewSet, self).list(request).data,
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Ингредиент из кэша справочника процесса."""
+
+        return Response(ingredients_cache.get_or_set(
+            ("detail", kwargs["pk"]),
+            lambda: super(IngredientViewSet, self).retrieve(
+                request, **kwargs).data,
+        ))
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """Подсказки ингредиентов по параметру name без учета регистра.
+        Сначала совпадения по началу названия, затем по его середине.
+        Количество подсказок ограничено параметром limit.
+        Поиск идет по индексу в памяти процесса, без запросов к базе."""
+
+        try:
+            limit = int(request.query_params.get(
+                "limit", LenghtField.AUTOCOMPLETE_LIMIT.value))
+        except ValueError:
+            limit = LenghtField.AUTOCOMPLETE_LIMIT.value
+        limit = min(limit, LenghtField.MAX_AUTOCOMPLETE_LIMIT.value)
+        return Response(
+            get_ingredient_index().search(
+                request.query_params.get("name", ""), limit)
+        )
+
 
 class RecipeViewSet(ModelViewSet):
     """Работа с рецептами. Отображение избранного, списка покупок.
@@ -63,10 +140,62 @@ class RecipeViewSet(ModelViewSet):
 
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrAdminOrIsAuthReadOnly]
-    pagination_class = PaginationCust
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FilterRecipe
 
+    def get_queryset(self):
+        """Рецепты с флагами избранного, списка покупок и подписки
+        на автора, посчитанными одним запросом на страницу.
+        Теги и состав блюда подгружаются сериализатором только
+        для рецептов, которых нет в кэше представлений."""
+
+        return Recipe.objects.with_user_flags(
+            self.request.user).select_related("author")
+
+    def list(self, request, *args, **kwargs):
+        """Страница рецептов. Если страница не изменилась с прошлого
+        запроса клиента (If-None-Match), отдается 304 без сериализации."""
+
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()))
+        versions = catalogue_versions()
+        etag = recipes_etag(
+            page,
+            request.query_params.urlencode(),
+            self.paginator.count,
+            versions=versions,
+        )
+        last_modified = max(
+            (recipe.updated_at for recipe in page), default=None)
+        response = not_modified(request, etag)
+        if response is None:
+            serializer = self.get_serializer(
+                page, many=True, context=self.get_versioned_context(versions))
+            response = self.get_paginated_response(serializer.data)
+        return set_conditional_headers(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт. Если он не изменился (If-None-Match), отдается 304."""
+
+        recipe = self.get_object()
+        versions = catalogue_versions()
+        etag = recipes_etag([recipe], versions=versions)
+        response = not_modified(request, etag)
+        if response is None:
+            response = Response(self.get_serializer(
+                recipe, context=self.get_versioned_context(versions)).data)
+        return set_conditional_headers(response, etag, recipe.updated_at)
+
+    def get_versioned_context(self, versions):
+        """Контекст сериализатора с версиями справочников, уже
+        прочитанными для ETag: сериализатор не читает их еще раз."""
+
+        return {
+            **self.get_serializer_context(),
+            "catalogue_versions": versions,
+        }
+
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от действия."""
 
@@ -170,53 +299,213 @@ class RecipeViewSet(ModelViewSet):
                 data={"detail": "Not found."}
             )
 
+    @action(detail=False, methods=["post"],
+            permission_classes=[IsAuthenticated],
+            parser_classes=(MultiPartParser, FileUploadParser))
+    def upload_image(self, request):
+        """Загрузка изображения рецепта отдельно от рецепта: поле image
+        формы multipart/form-data или файл телом запроса (с заголовком
+        Content-Disposition: attachment; filename=...). Файл не читается
+        в память целиком: Django пишет его кусками во временный файл,
+        который затем переносится в MEDIA_ROOT. В ответе handle -
+        значение для поля image рецепта вместо base64."""
+
+        serializer = RecipeImageUploadSerializer(
+            data={"image": request.data.get("image")
+                  or request.data.get("file")},
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"],
+            permission_classes=[CanImportRecipes])
+    def bulk_import(self, request):
+        """Массовый импорт рецептов текущего пользователя
+        (админ или партнер с правом recipes.import_recipes).
+        Тело - NDJSON (application/x-ndjson): один рецепт в формате
+        POST /api/recipes/ на строку. Тело читается построчно, рецепты
+        проверяются и вставляются пачками (api.imports). Строки
+        с ошибками пропускаются и возвращаются в отчете с номерами."""
+
+        report = import_recipes(
+            request.stream or (),
+            request.user,
+            context=self.get_serializer_context(),
+        )
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED
+            if report["created"]
+            else status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=False, methods=["get"],
-            permission_classes=[IsAuthenticated])
-    def download_shopping_cart(self, request):
-        """Получение списка покупок у текущего пользователя из
-        базы данных. Использует этот буфер для создания
-        HTTP-ответа с прикрепленным PDF-файлом."""
-
-        pdf_filename = "shopping_cart.pdf"
-        buffer = io.BytesIO()
-        pdfmetrics.registerFont(TTFont("DejaVuSans", "DejaVuSans.ttf"))
-
-        pdf = canvas.Canvas(buffer)
-        y = 800
-        recipes = Recipe.objects.filter(shoppingcart__user=request.user)
-        buy_list = (
-            CompositionOfDish.objects.filter(recipe__in=recipes)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
-            .order_by("ingredient__name")
+            renderer_classes=RECIPE_EXPORT_RENDERERS)
+    def export(self, request):
+        """Выгрузка всех рецептов с тегами и составом блюда потоком,
+        без пагинации. Формат - по заголовку Accept или параметру
+        ?format=: ndjson (по умолчанию) или csv. Работают фильтры
+        списка рецептов, в том числе is_favorited и is_in_shopping_cart
+        для выгрузки избранного и корзины. Рецепты читаются из базы
+        пачками (api.exports), память не растет с размером каталога."""
+
+        recipes = export_recipes(
+            self.filter_queryset(Recipe.objects.all()),
+            image_url=request.build_absolute_uri,
         )
-        buy_list_text = "Foodgram - Список покупок: \n"
-        for item in buy_list.values(
-            "ingredient__name",
-            "ingredient__measurement_unit",
-            "total_amount",
-        ):
-            amount = item["total_amount"]
-            name = item["ingredient__name"]
-            measurement_unit = item["ingredient__measurement_unit"]
-            buy_list_text += f"{name}, {amount} {measurement_unit} \n"
-
-        pdf.setFont("DejaVuSans", 14)
-        print(buy_list_text)
-        lines = buy_list_text.split("\n")
-        for line in lines:
-            line = line.strip()
-            pdf.drawString(100, y, line)
-            y -= 20
-
-        y -= 20
-        pdf.showPage()
-        pdf.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(),
-                                content_type="application/pdf")
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            EXPORT_WRITERS[renderer.format](recipes),
+            content_type=f"{renderer.media_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
+    @action(detail=False, methods=["get"],
+            pagination_class=PaginationCust)
+    def pantry(self, request):
+        """Что можно приготовить из своих ингредиентов.
+        ingredients - id ингредиентов (через запятую или несколькими
+        параметрами), max_missing - сколько ингредиентов может не
+        хватать. Рецепты идут по возрастанию недостающих ингредиентов,
+        затем времени приготовления. Поиск идет по обратному индексу
+        в памяти процесса (recipes.pantry), из базы читается только
+        страница рецептов."""
+
+        ingredient_ids = self.get_int_params(request, "ingredients")
+        if not ingredient_ids:
+            raise ValidationError(
+                {"ingredients": "Укажите id ингредиентов."})
+        max_missing = self.get_int_params(request, "max_missing")
+        if any(value < 0 for value in max_missing):
+            raise ValidationError(
+                {"max_missing": "Ожидается неотрицательное число."})
+        page = self.paginate_queryset(
+            search_pantry(
+                ingredient_ids, max_missing[0] if max_missing else None)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        found = []
+        for recipe_id, missing in page:
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_ingredients = missing
+                found.append(recipes[recipe_id])
+        serializer = PantryRecipeSerializer(
+            found, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_int_params(request, name):
+        """Целые числа из параметра запроса name: через запятую
+        или несколькими параметрами."""
+
+        try:
+            return [
+                int(value)
+                for param in request.query_params.getlist(name)
+                for value in param.split(",")
+                if value.strip()
+            ]
+        except ValueError:
+            raise ValidationError({name: "Ожидаются целые числа."})
+
+    @action(detail=False, methods=["get"],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """Лента: рецепты авторов, на которых подписан пользователь,
+        от новых к старым, с пагинацией по ключу (cursor).
+        У пользователей с большим количеством подписок страница
+        выбирается по готовой ленте из кэша (recipes.feed)."""
+
+        queryset = self.get_queryset().filter(feed_filter(request.user))
+        ids = feed_page_ids(
+            request.user,
+            self.paginator.get_position(request),
+            self.paginator.get_page_size(request) + 1,
+        )
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=SHOPPING_LIST_RENDERERS)
+    def download_shopping_cart(self, request):
+        """Получение списка покупок у текущего пользователя.
+        Формат выбирается по заголовку Accept или параметру ?format=:
+        pdf (по умолчанию), csv, txt, json. Все форматы строятся
+        по одному агрегирующему запросу. Готовый PDF-файл берется
+        из кэша и пересобирается только после изменения корзины,
+        файл отдается потоком (FileResponse - это StreamingHttpResponse)."""
+
+        file_format = request.accepted_renderer.format
+        filename = f"shopping_cart.{file_format}"
+        if file_format == "pdf":
+            return FileResponse(
+                get_shopping_list_pdf(request.user),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/pdf",
+            )
+        buy_list = [
+            {
+                "name": item["name"],
+                "measurement_unit": item["measurement_unit"],
+                "amount": item["total_amount"],
+            }
+            for item in get_shopping_list(request.user)
+        ]
+        response = Response(buy_list)
         response["Content-Disposition"] = (
-            f'attachment; filename="'
-            f'{pdf_filename}"'
+            f'attachment; filename="{filename}"'
         )
         return response
+
+
+class ShoppingListExportViewSet(mixins.CreateModelMixin,
+                                mixins.ListModelMixin,
+                                mixins.RetrieveModelMixin,
+                                GenericViewSet):
+    """Асинхронная выгрузка списка покупок.
+    POST ставит задание в очередь и сразу возвращает его id,
+    файл собирает фоновый обработчик (run_export_worker).
+    Клиент опрашивает задание и скачивает готовый файл."""
+
+    serializer_class = ShoppingListExportSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = PaginationCust
+
+    def get_queryset(self):
+        return ShoppingListExport.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """Задание принято в работу, но еще не выполнено."""
+
+        export = ShoppingListExport.objects.create(user=request.user)
+        serializer = self.get_serializer(export)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk):
+        """Скачивание готового файла выгрузки."""
+
+        export = self.get_object()
+        if export.status != ShoppingListExport.StatusChoices.DONE:
+            return Response(
+                {"detail": "Выгрузка еще не готова."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            export.file.open("rb"),
+            as_attachment=True,
+            filename="shopping_cart.pdf",
+            content_type="application/pdf",
+        )
@@ -35,9 +35,20 @@ class LenghtField(IntEnum):
     # Максимальная длина поля role User.role
     MAX_LENGHT_ROLE = 150
 
+    # Максимальная длина состояния задания ShoppingListExport.status
+    MAX_LENGHT_EXPORT_STATUS = 16
+    # Максимальная длина имени изображения RecipeImageTask.image
+    # (как у Recipe.image, ImageField по умолчанию)
+    MAX_LENGHT_IMAGE_NAME = 100
+
     # page_size = 6 for API PaginationCust.page_size
     PAGE_SIZE = 6
 
+    # Автодополнение ингредиентов: количество подсказок по умолчанию
+    # и максимальное количество по параметру limit.
+    AUTOCOMPLETE_LIMIT = 10
+    MAX_AUTOCOMPLETE_LIMIT = 50
+
     # Минимальная длина логина пользователя
     MIN_LENGHT_LOGIN_USER = 1
     # Минимальная длина поля first_name
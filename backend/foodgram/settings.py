@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "users.apps.UsersConfig",
     "rest_framework",
     "rest_framework.authtoken",
@@ -75,6 +76,20 @@ DATABASES = {
     }
 }
 
+# Кэш (готовые списки покупок, версии корзин и справочников и пр.).
+# Версии должны быть общими для всех процессов gunicorn и фоновых
+# обработчиков, поэтому по умолчанию DatabaseCache (таблица создается
+# командой createcachetable). LocMemCache (CACHE_BACKEND) годится только
+# для одного процесса.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram_cache"),
+    }
+}
+
 # Абстракция Usera для app users
 AUTH_USER_MODEL = "users.User"
 
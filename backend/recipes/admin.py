@@ -8,7 +8,9 @@ from recipes.models import (
     Recipe,
     CompositionOfDish,
     Favorite,
+    RecipeImageTask,
     ShoppingCart,
+    ShoppingListExport,
 )
 
 
@@ -38,6 +40,8 @@ class RecipeAdmin(admin.ModelAdmin):
         "text",
         "cooking_time",
         "pub_date",
+        "favorites_count",
+        "in_carts_count",
     )
     search_fields = ("author",)
     list_filter = (
@@ -98,6 +102,24 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     search_fields = ("user",)
 
 
+@admin.register(ShoppingListExport)
+class ShoppingListExportAdmin(admin.ModelAdmin):
+    """Настроенная админ-панель выгрузок списков покупок."""
+
+    list_display = ("id", "user", "status", "created", "finished")
+    list_filter = ("status",)
+    search_fields = ("user__username",)
+
+
+@admin.register(RecipeImageTask)
+class RecipeImageTaskAdmin(admin.ModelAdmin):
+    """Настроенная админ-панель заданий на копии изображений."""
+
+    list_display = ("id", "recipe", "status", "created", "finished")
+    list_filter = ("status",)
+    raw_id_fields = ("recipe",)
+
+
 class CompositionOfDish(admin.TabularInline):
     """Отображение состава блюда в виде таблицы.
     Промежуточная моделт Рецепты, минимум с 1-й строкой."""
@@ -0,0 +1,181 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from recipes.models import Ingredient, Tag
+
+# Версии справочников ингредиентов и тегов в общем кэше. Меняются
+# при любом изменении справочника, и каждый процесс по ним узнает,
+# что его локальный кэш устарел.
+INGREDIENTS_VERSION_KEY = "catalogue_version:ingredients"
+TAGS_VERSION_KEY = "catalogue_version:tags"
+# Максимальное количество записей в кэше справочника одного процесса.
+CATALOGUE_CACHE_SIZE = 256
+# Данные справочника в кэше процесса перечитываются не реже, чем раз
+# за это время, секунды. Страховка на случай, если общий кэш
+# на самом деле локальный (LocMemCache) и изменение версии в другом
+# процессе (load_ingredients, другой процесс gunicorn) сюда не доходит.
+CATALOGUE_CACHE_TTL = 300
+# Версия справочника из общего кэша перечитывается процессом не чаще,
+# чем раз за это время, секунды. Общий кэш может быть таблицей
+# в базе (DatabaseCache), и проверка версии на каждый запрос стоила бы
+# запроса к базе. Изменения из других процессов видны с этой задержкой,
+# изменения в своем процессе - сразу.
+CATALOGUE_VERSION_CHECK_INTERVAL = 5
+
+# Последние прочитанные версии справочников процесса:
+# ключ версии -> (версия, когда перечитать по time.monotonic()).
+version_stamps = {}
+
+
+def get_catalogue_version(key):
+    """Текущая версия справочника. Из общего кэша читается не чаще
+    раза в CATALOGUE_VERSION_CHECK_INTERVAL."""
+
+    now = time.monotonic()
+    stamp = version_stamps.get(key)
+    if stamp is not None and now < stamp[1]:
+        return stamp[0]
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    version_stamps[key] = (version, now + CATALOGUE_VERSION_CHECK_INTERVAL)
+    return version
+
+
+def bump_catalogue_version(key):
+    """Помечает справочник измененным во всех процессах."""
+
+    version = uuid4().hex
+    cache.set(key, version, None)
+    version_stamps[key] = (
+        version, time.monotonic() + CATALOGUE_VERSION_CHECK_INTERVAL)
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+    Названия в нижнем регистре хранятся отсортированными, поэтому
+    совпадения по началу строки находятся бинарным поиском."""
+
+    def __init__(self, ingredients):
+        self.items = {}
+        self.keys = []
+        for ingredient in ingredients:
+            self.items[ingredient["id"]] = ingredient
+            self.keys.append((ingredient["name"].lower(), ingredient["id"]))
+        self.keys.sort()
+
+    def search(self, query, limit):
+        """Ингредиенты, название которых начинается с query,
+        затем содержащие query в середине. Не больше limit штук."""
+
+        query = query.strip().lower()
+        if not query or limit < 1:
+            return []
+        found = []
+        position = bisect_left(self.keys, (query,))
+        for name, ingredient_id in self.keys[position:]:
+            if not name.startswith(query) or len(found) == limit:
+                break
+            found.append(ingredient_id)
+        if len(found) < limit:
+            for name, ingredient_id in self.keys:
+                if query in name and not name.startswith(query):
+                    found.append(ingredient_id)
+                    if len(found) == limit:
+                        break
+        return [self.items[ingredient_id] for ingredient_id in found]
+
+
+class LRUCache:
+    """LRU-кэш в памяти процесса ограниченного размера.
+    При переполнении вытесняются записи, которые дольше всего
+    не запрашивались."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Значение по ключу или None."""
+
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.put(key, value)
+
+    def put(self, key, value):
+        """Сохраняет значение. Вызывается под self.lock."""
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class CatalogueCache(LRUCache):
+    """LRU-кэш в памяти процесса для данных справочника.
+    Все записи сбрасываются, когда версия справочника в общем кэше
+    меняется (сигналы post_save/post_delete), и не реже раза в ttl."""
+
+    def __init__(self, version_key, maxsize, ttl=CATALOGUE_CACHE_TTL):
+        super().__init__(maxsize)
+        self.version_key = version_key
+        self.ttl = ttl
+        self.version = None
+        self.expires = 0
+
+    def get_or_set(self, key, default):
+        """Значение по ключу или результат default(), сохраненный в кэш."""
+
+        version = get_catalogue_version(self.version_key)
+        now = time.monotonic()
+        with self.lock:
+            if version != self.version or now >= self.expires:
+                self.entries.clear()
+                self.version = version
+                self.expires = now + self.ttl
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = default()
+        with self.lock:
+            if version == self.version:
+                self.put(key, value)
+        return value
+
+
+tags_cache = CatalogueCache(TAGS_VERSION_KEY, CATALOGUE_CACHE_SIZE)
+ingredients_cache = CatalogueCache(
+    INGREDIENTS_VERSION_KEY, CATALOGUE_CACHE_SIZE)
+
+
+def get_tags():
+    """Теги справочника по id, без запроса к базе при неизменных тегах."""
+
+    return tags_cache.get_or_set(
+        "objects", lambda: Tag.objects.in_bulk())
+
+
+def get_ingredient_index():
+    """Индекс ингредиентов процесса. Перестраивается одним запросом,
+    если версия справочника в общем кэше изменилась."""
+
+    return ingredients_cache.get_or_set(
+        "index",
+        lambda: IngredientIndex(
+            Ingredient.objects.values("id", "name", "measurement_unit")
+        ),
+    )
@@ -0,0 +1,59 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+# Счетчики: (модель, поле счетчика, считаемая модель, поле связи).
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "in_carts_count", ShoppingCart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+)
+# Количество строк в одном UPDATE при пересчете счетчиков.
+REPAIR_BATCH_SIZE = 1000
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик одной строки: UPDATE ... SET
+    field = field + delta, без чтения значения в Python.
+    Ниже нуля счетчик не опускается."""
+
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def actual_count(counted_model, relation):
+    """Подзапрос с настоящим количеством связанных строк."""
+
+    return Coalesce(
+        Subquery(
+            counted_model.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def repair_counters(batch_size=REPAIR_BATCH_SIZE):
+    """Находит строки с неверными счетчиками и пересчитывает их
+    пачками по batch_size. Возвращает {поле: исправлено строк}."""
+
+    repaired = {}
+    for model, field, counted_model, relation in COUNTERS:
+        actual = actual_count(counted_model, relation)
+        drifted = list(
+            model.objects.order_by()
+            .annotate(actual=actual)
+            .exclude(**{field: F("actual")})
+            .values_list("pk", flat=True)
+        )
+        for start in range(0, len(drifted), batch_size):
+            model.objects.filter(
+                pk__in=drifted[start:start + batch_size]
+            ).update(**{field: actual})
+        repaired[field] = len(drifted)
+    return repaired
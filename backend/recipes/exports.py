@@ -0,0 +1,83 @@
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+
+from django.core.files import File
+from django.utils import timezone
+
+from recipes.models import ShoppingListExport
+from recipes.shopping_list import (
+    SHOPPING_LIST_SPOOL_SIZE,
+    format_shopping_list,
+    get_shopping_list,
+    render_shopping_list_pdf,
+)
+from recipes.tasks import claim_next_task, requeue_stale_tasks
+
+# Задание в работе дольше этого времени считается брошенным
+# (обработчик упал) и возвращается в очередь.
+EXPORT_STALE_TIMEOUT = timedelta(minutes=10)
+# Выполненные задания и их файлы хранятся это время после окончания,
+# затем удаляются (команда clean_exports).
+EXPORT_TTL = timedelta(days=1)
+
+Status = ShoppingListExport.StatusChoices
+
+
+def claim_next_export():
+    """Забирает из очереди самое старое ожидающее задание."""
+
+    return claim_next_task(
+        ShoppingListExport.objects.select_related("user"))
+
+
+def run_export(export):
+    """Собирает файл списка покупок и сохраняет результат задания."""
+
+    try:
+        with SpooledTemporaryFile(max_size=SHOPPING_LIST_SPOOL_SIZE) as output:
+            render_shopping_list_pdf(
+                format_shopping_list(get_shopping_list(export.user)), output)
+            output.seek(0)
+            export.file.save(
+                f"shopping_list_{export.id}.pdf", File(output), save=False
+            )
+        export.status = Status.DONE
+    except Exception as error:
+        export.status = Status.FAILED
+        export.error = str(error)
+    export.finished = timezone.now()
+    export.save(update_fields=("file", "status", "error", "finished"))
+    return export
+
+
+def requeue_stale_exports(timeout=EXPORT_STALE_TIMEOUT):
+    """Возвращает в очередь задания, зависшие в работе."""
+
+    return requeue_stale_tasks(ShoppingListExport, timeout)
+
+
+def process_next_export():
+    """Выполняет одно задание из очереди.
+    Возвращает задание или None, если очередь пуста."""
+
+    export = claim_next_export()
+    if export is None:
+        return None
+    return run_export(export)
+
+
+def delete_finished_exports(ttl=EXPORT_TTL):
+    """Удаляет выполненные и упавшие задания, закончившиеся раньше
+    чем ttl назад, вместе с файлами. Возвращает их количество."""
+
+    exports = ShoppingListExport.objects.filter(
+        status__in=(Status.DONE, Status.FAILED),
+        finished__lt=timezone.now() - ttl,
+    )
+    deleted = 0
+    for export in exports.iterator():
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+        deleted += 1
+    return deleted
@@ -0,0 +1,132 @@
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import Recipe
+from users.models import Subscriptions
+
+# Готовая лента пользователя: ключи (позиция, id) самых новых рецептов
+# авторов, на которых он подписан.
+FEED_KEY = "recipe_feed:{user_id}"
+# Лента хранится в кэше только у пользователей, подписанных на столько
+# авторов или больше. Остальным хватает одного запроса к базе.
+FEED_MATERIALIZE_THRESHOLD = 100
+# Количество рецептов в готовой ленте. Дальше лента читается из базы.
+FEED_CACHE_SIZE = 1000
+# Время жизни готовой ленты, секунды.
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def feed_filter(user):
+    """Рецепты авторов, на которых подписан пользователь.
+    Подзапрос по подпискам и индекс (author, -pub_date, id)."""
+
+    return Q(
+        author__in=Subscriptions.objects.filter(user=user).values("author")
+    )
+
+
+def feed_item(pub_date, recipe_id):
+    """Ключ рецепта в ленте: по возрастанию ключа рецепты идут
+    в порядке (-pub_date, id)."""
+
+    return (-((pub_date - FEED_EPOCH) // timedelta(microseconds=1)),
+            recipe_id)
+
+
+def build_feed(user):
+    """Собирает готовую ленту пользователя одним запросом."""
+
+    recipes = (
+        Recipe.objects.filter(feed_filter(user))
+        .order_by("-pub_date", "id")
+        .values_list("pub_date", "id")[:FEED_CACHE_SIZE]
+    )
+    items = [feed_item(pub_date, recipe_id) for pub_date, recipe_id in recipes]
+    return {"items": items, "complete": len(items) < FEED_CACHE_SIZE}
+
+
+def get_feed(user):
+    """Готовая лента пользователя или None, если подписок мало."""
+
+    key = FEED_KEY.format(user_id=user.id)
+    feed = cache.get(key)
+    if feed is None:
+        subscriptions = Subscriptions.objects.filter(user=user).count()
+        if subscriptions < FEED_MATERIALIZE_THRESHOLD:
+            return None
+        feed = build_feed(user)
+        cache.set(key, feed, FEED_CACHE_TIMEOUT)
+    return feed
+
+
+def feed_page_ids(user, position, size):
+    """id рецептов ленты после позиции курсора [pub_date, id] (или
+    с начала при None), не больше size. None, если готовой ленты нет
+    или она закончилась раньше, чем лента в базе."""
+
+    feed = get_feed(user)
+    if feed is None:
+        return None
+    start = 0
+    if position is not None:
+        pub_date = parse_datetime(str(position[0]))
+        if (
+            pub_date is None
+            or pub_date.tzinfo is None
+            or not isinstance(position[1], int)
+        ):
+            return None
+        start = bisect_right(
+            feed["items"], feed_item(pub_date, position[1]))
+    items = feed["items"][start:start + size]
+    if len(items) < size and not feed["complete"]:
+        return None
+    return [recipe_id for _, recipe_id in items]
+
+
+def update_feeds(recipe, added):
+    """Добавляет рецепт в готовые ленты подписчиков автора
+    или убирает его оттуда. Ленты без кэша не создаются."""
+
+    keys = [
+        FEED_KEY.format(user_id=user_id)
+        for user_id in Subscriptions.objects.filter(
+            author_id=recipe.author_id
+        ).values_list("user_id", flat=True)
+    ]
+    item = feed_item(recipe.pub_date, recipe.id)
+    feeds = cache.get_many(keys)
+    for feed in feeds.values():
+        if added:
+            insort(feed["items"], item)
+            if len(feed["items"]) > FEED_CACHE_SIZE:
+                feed["items"].pop()
+                feed["complete"] = False
+        elif item in feed["items"]:
+            feed["items"].remove(item)
+    cache.set_many(feeds, FEED_CACHE_TIMEOUT)
+
+
+def drop_feed(user_id):
+    """Список авторов изменился: лента соберется заново."""
+
+    cache.delete(FEED_KEY.format(user_id=user_id))
+
+
+def drop_subscriber_feeds(author_ids):
+    """Рецепты авторов добавлены в обход сигналов (массовый импорт):
+    ленты их подписчиков соберутся заново."""
+
+    cache.delete_many(
+        [
+            FEED_KEY.format(user_id=user_id)
+            for user_id in Subscriptions.objects.filter(
+                author__in=author_ids
+            ).values_list("user_id", flat=True)
+        ]
+    )
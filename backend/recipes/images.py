@@ -0,0 +1,184 @@
+from datetime import timedelta
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import (
+    Recipe,
+    RecipeImageTask,
+    RecipeImageUpload,
+    TaskStatus,
+)
+from recipes.tasks import claim_next_task, requeue_stale_tasks
+
+# Уменьшенные копии изображения рецепта: имя -> (ширина, высота, формат).
+# Изображение обрезается по центру до точного размера копии.
+IMAGE_VARIANTS = {
+    "thumbnail": (160, 160, "JPEG"),
+    "thumbnail_webp": (160, 160, "WEBP"),
+    "card_webp": (480, 480, "WEBP"),
+}
+IMAGE_VARIANT_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANTS_DIR = "recipes/variants"
+# Задание в работе дольше этого времени считается брошенным
+# (обработчик упал) и возвращается в очередь.
+IMAGE_STALE_TIMEOUT = timedelta(minutes=10)
+# Максимальный размер изображения, загружаемого отдельно от рецепта.
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+# Загруженное изображение, на которое за это время не сослался
+# ни один рецепт, удаляется (команда clean_image_uploads).
+IMAGE_UPLOAD_TTL = timedelta(days=1)
+
+
+def image_variants_outdated(recipe):
+    """Копии не сделаны для текущего изображения рецепта."""
+
+    return bool(recipe.image) and (
+        recipe.image_variants.get("source") != recipe.image.name)
+
+
+def image_variant_urls(recipe):
+    """Адреса копий текущего изображения по имени копии.
+    Пока обработчик не сделал копии - пустой словарь."""
+
+    if not recipe.image or image_variants_outdated(recipe):
+        return {}
+    return {
+        name: default_storage.url(path)
+        for name, path in recipe.image_variants["files"].items()
+    }
+
+
+def enqueue_image_tasks(recipes):
+    """Ставит в очередь задания на копии изображений рецептов."""
+
+    RecipeImageTask.objects.bulk_create(
+        RecipeImageTask(recipe=recipe, image=recipe.image.name)
+        for recipe in recipes
+        if recipe.image
+    )
+
+
+def request_image_variants(recipe):
+    """Задание на копии, если изображение новое и задания еще нет."""
+
+    if image_variants_outdated(recipe) and not (
+        RecipeImageTask.objects.filter(
+            recipe=recipe,
+            image=recipe.image.name,
+            status__in=(TaskStatus.PENDING, TaskStatus.RUNNING),
+        ).exists()
+    ):
+        enqueue_image_tasks([recipe])
+
+
+def render_variant(image, width, height, image_format):
+    """Копия изображения заданного размера в байтах."""
+
+    variant = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    has_alpha = "A" in variant.getbands() or "transparency" in variant.info
+    mode = "RGBA" if has_alpha and image_format == "WEBP" else "RGB"
+    if variant.mode != mode:
+        variant = variant.convert(mode)
+    output = BytesIO()
+    variant.save(output, image_format, quality=IMAGE_VARIANT_QUALITY)
+    return output.getvalue()
+
+
+def build_variants(recipe):
+    """Сохраняет копии изображения рецепта в хранилище.
+    Возвращает {имя копии: путь}."""
+
+    largest = (
+        max(width for width, _, _ in IMAGE_VARIANTS.values()),
+        max(height for _, height, _ in IMAGE_VARIANTS.values()),
+    )
+    with recipe.image.open("rb") as file:
+        image = Image.open(file)
+        # JPEG декодируется сразу в уменьшенном виде,
+        # не меньше самой большой копии.
+        image.draft("RGB", largest)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    stem = PurePosixPath(recipe.image.name).stem
+    files = {}
+    for name, (width, height, image_format) in IMAGE_VARIANTS.items():
+        extension = IMAGE_VARIANT_EXTENSIONS[image_format]
+        files[name] = default_storage.save(
+            f"{IMAGE_VARIANTS_DIR}/{recipe.id}/{stem}_{name}.{extension}",
+            ContentFile(render_variant(image, width, height, image_format)),
+        )
+    return files
+
+
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+def run_image_task(task):
+    """Делает копии изображения и сохраняет результат задания.
+    Если изображение рецепта успело смениться, копии не записываются:
+    для нового изображения стоит свое задание."""
+
+    try:
+        recipe = Recipe.objects.filter(
+            id=task.recipe_id, image=task.image).first()
+        if recipe is not None:
+            files = build_variants(recipe)
+            # updated_at меняется, чтобы кэши представлений
+            # и ETag рецепта обновились вместе с копиями.
+            updated = Recipe.objects.filter(
+                id=recipe.id, image=task.image
+            ).update(
+                image_variants={"source": task.image, "files": files},
+                updated_at=timezone.now(),
+            )
+            old_files = recipe.image_variants.get("files", {})
+            delete_files(
+                set(old_files.values()) - set(files.values())
+                if updated
+                else files.values()
+            )
+        task.status = TaskStatus.DONE
+    except Exception as error:
+        task.status = TaskStatus.FAILED
+        task.error = str(error)
+    task.finished = timezone.now()
+    task.save(update_fields=("status", "error", "finished"))
+    return task
+
+
+def requeue_stale_image_tasks(timeout=IMAGE_STALE_TIMEOUT):
+    """Возвращает в очередь задания, зависшие в работе."""
+
+    return requeue_stale_tasks(RecipeImageTask, timeout)
+
+
+def process_next_image_task():
+    """Выполняет одно задание из очереди.
+    Возвращает задание или None, если очередь пуста."""
+
+    task = claim_next_task(RecipeImageTask.objects.all())
+    if task is None:
+        return None
+    return run_image_task(task)
+
+
+def delete_stale_uploads(ttl=IMAGE_UPLOAD_TTL):
+    """Удаляет загруженные изображения, которые не понадобились
+    ни одному рецепту за время ttl. Возвращает их количество."""
+
+    uploads = RecipeImageUpload.objects.filter(
+        created__lt=timezone.now() - ttl)
+    deleted = 0
+    for upload in uploads.iterator():
+        upload.image.delete(save=False)
+        upload.delete()
+        deleted += 1
+    return deleted
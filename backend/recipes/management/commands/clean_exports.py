@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from recipes.exports import delete_finished_exports
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'clean_exports' удаляет выгрузки
+    списков покупок, выполненные больше суток назад, вместе с файлами."""
+
+    help = "Удаление старых выгрузок списков покупок."
+
+    def handle(self, *args: Any, **options: Any):
+        deleted = delete_finished_exports()
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено выгрузок: {deleted}"))
@@ -0,0 +1,18 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'clean_image_uploads' удаляет
+    изображения, загруженные через /api/recipes/upload_image/,
+    на которые за сутки не сослался ни один рецепт."""
+
+    help = "Удаление неиспользованных загруженных изображений."
+
+    def handle(self, *args: Any, **options: Any):
+        deleted = delete_stale_uploads()
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено изображений: {deleted}"))
@@ -1,28 +1,151 @@
 import csv
+import json
+from itertools import islice
+from pathlib import Path
 from typing import Any
-from django.core.management.base import BaseCommand
 
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.catalogue import INGREDIENTS_VERSION_KEY, bump_catalogue_version
 from recipes.models import Ingredient
 
+DEFAULT_FILE = Path(settings.BASE_DIR) / "data" / "ingredients.csv"
+DEFAULT_BATCH_SIZE = 1000
+# Размер куска файла при потоковом чтении JSON, символы.
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Строки CSV вида: название,единица измерения."""
+
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Объекты JSON-массива [{"name": ..., "measurement_unit": ...}]
+    по одному, без загрузки всего файла в память."""
+
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    index = 0
+    for chunk in iter(lambda: file.read(JSON_CHUNK_SIZE), ""):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and buffer[position:position + 1] == "[":
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield json_ingredient(item, index)
+            index += 1
+    if buffer[position:].strip():
+        raise CommandError("Некорректный JSON в файле ингредиентов.")
+
+
+def json_ingredient(item, index):
+    """Название и единица измерения из элемента JSON-массива."""
+
+    if not isinstance(item, dict) or not all(
+        isinstance(item.get(field), str)
+        for field in ("name", "measurement_unit")
+    ):
+        raise CommandError(
+            f"Элемент {index} файла ингредиентов должен быть объектом "
+            f"со строками name и measurement_unit."
+        )
+    return item["name"], item["measurement_unit"]
+
+
+READERS = {"csv": read_csv, "json": read_json}
+
 
 class Command(BaseCommand):
     """Команда python manage.py 'load_ingredients' загружает ингредиенты
-    в базу из csv файла, который располагается в директории /data/... ."""
+    в базу из csv или json файла (по умолчанию data/ingredients.csv).
+    Файл читается потоком, ингредиенты вставляются пачками через
+    bulk_create(ignore_conflicts=True): уже существующие пары
+    (name, measurement_unit) пропускаются по ограничению
+    unique_measurement_unit, поэтому повторный запуск безопасен."""
+
+    help = "Загрузка ингредиентов из csv/json файла."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=str(DEFAULT_FILE),
+            help="Путь к файлу с ингредиентами.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Формат файла. По умолчанию - по расширению файла.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Количество ингредиентов в одном INSERT.",
+        )
 
     def handle(self, *args: Any, **options: Any) -> str:
+        path = Path(options["file"])
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in READERS:
+            raise CommandError(
+                f"Неизвестный формат файла: {file_format}. "
+                f"Укажите --format {'|'.join(sorted(READERS))}."
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
         try:
-            self.import_ingredients_csv()
-            print("Загрузка ингредиентов произошла успешно!")
-        except Exception:
-            raise ("Ошибка при загрузке ингредиентов:")
-
+            with open(path, newline="", encoding="utf-8") as file:
+                processed, created = self.import_ingredients(
+                    READERS[file_format](file), options["batch_size"]
+                )
+        except (OSError, KeyError, ValueError) as error:
+            raise CommandError(
+                f"Ошибка при загрузке ингредиентов: {error}") from error
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загрузка ингредиентов произошла успешно! "
+                f"Обработано: {processed}, добавлено: {created}."
+            )
+        )
         return "Обработка файла завершена."
 
-    def import_ingredients_csv(self, file="data/ingredients.csv"):
-        with open(file, newline="", encoding="utf-8") as file_all:
-            reader = csv.reader(file_all)
-            for row in reader:
-                name, measurement_unit, *_ = row
-                status, created = Ingredient.objects.update_or_create(
-                    name=name, measurement_unit=measurement_unit
+    def import_ingredients(self, rows, batch_size):
+        """Вставляет ингредиенты пачками и сообщает о прогрессе."""
+
+        count_before = Ingredient.objects.count()
+        processed = 0
+        rows = iter(rows)
+        while True:
+            batch = [
+                Ingredient(
+                    name=name.strip(),
+                    measurement_unit=measurement_unit.strip(),
                 )
+                for name, measurement_unit in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+            processed += len(batch)
+            self.stdout.write(f"Обработано строк: {processed}")
+        # bulk_create не отправляет сигналы, индекс автодополнения
+        # помечается устаревшим явно.
+        bump_catalogue_version(INGREDIENTS_VERSION_KEY)
+        return processed, Ingredient.objects.count() - count_before
@@ -0,0 +1,59 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.rankings import (
+    RANKING_BATCH_SIZE,
+    rebuild_popular,
+    refresh_rankings,
+)
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'refresh_rankings' пересчитывает рейтинги
+    рецептов (ordering=popular/trending) по журналу RecipeActivity.
+    Обновляются только рецепты, с которыми что-то произошло с прошлого
+    прохода. Запускается одним процессом."""
+
+    help = "Инкрементальный пересчет рейтингов рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RANKING_BATCH_SIZE,
+            help="Количество событий за один проход.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=10.0,
+            help="Пауза между опросами пустого журнала, секунды.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Разобрать журнал и завершиться.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Сначала заполнить popular для всех рецептов.",
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
+        if options["rebuild"]:
+            rebuilt = rebuild_popular(batch_size)
+            self.stdout.write(f"Рейтинги popular заполнены: {rebuilt}")
+        while True:
+            processed = refresh_rankings(batch_size)
+            if processed:
+                self.stdout.write(f"Обработано событий: {processed}")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
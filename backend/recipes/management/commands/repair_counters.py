@@ -0,0 +1,29 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.counters import REPAIR_BATCH_SIZE, repair_counters
+
+
+class Command(BaseCommand):
+    """Команда python manage.py 'repair_counters' пересчитывает счетчики
+    Recipe.favorites_count, Recipe.in_carts_count и User.recipes_count.
+    Исправляются только строки, где счетчик расходится с настоящим
+    количеством (например, после bulk_create или правки базы вручную)."""
+
+    help = "Пересчет счетчиков избранного, корзин и рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REPAIR_BATCH_SIZE,
+            help="Количество строк в одном UPDATE.",
+        )
+
+    def handle(self, *args: Any, **options: Any):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
+        for field, repaired in repair_counters(options["batch_size"]).items():
+            self.stdout.write(f"{field}: исправлено строк {repaired}")
+        self.stdout.write(self.style.SUCCESS("Счетчики пересчитаны."))
@@ -0,0 +1,18 @@
+from recipes.exports import process_next_export, requeue_stale_exports
+from recipes.tasks import WorkerCommand
+
+
+class Command(WorkerCommand):
+    """Команда python manage.py 'run_export_worker' выполняет задания
+    на выгрузку списков покупок из очереди в базе данных.
+    Внешний брокер не нужен: обработчики забирают задания из таблицы
+    ShoppingListExport пулом потоков в одном процессе."""
+
+    help = "Обработчик очереди выгрузок списков покупок."
+    task_label = "Выгрузка"
+
+    def process_next(self):
+        return process_next_export()
+
+    def requeue_stale(self):
+        requeue_stale_exports()
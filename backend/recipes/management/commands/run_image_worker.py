@@ -0,0 +1,60 @@
+from itertools import islice
+
+from recipes.images import (
+    enqueue_image_tasks,
+    image_variants_outdated,
+    process_next_image_task,
+    requeue_stale_image_tasks,
+)
+from recipes.models import Recipe
+from recipes.tasks import WorkerCommand
+
+# Количество рецептов в одной пачке при --backfill.
+BACKFILL_BATCH_SIZE = 1000
+
+
+class Command(WorkerCommand):
+    """Команда python manage.py 'run_image_worker' делает уменьшенные
+    копии изображений рецептов (миниатюры, WebP) по заданиям из очереди
+    RecipeImageTask. С --backfill сначала ставит задания для рецептов,
+    у которых копий еще нет (например, загруженных до появления копий)."""
+
+    help = "Обработчик очереди уменьшенных копий изображений рецептов."
+    task_label = "Изображение"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Поставить задания для рецептов без копий изображений.",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self.backfill()
+        super().handle(*args, **options)
+
+    def backfill(self):
+        recipes = (
+            Recipe.objects.only("id", "image", "image_variants")
+            .order_by("id")
+            .iterator(chunk_size=BACKFILL_BATCH_SIZE)
+        )
+        queued = 0
+        while True:
+            batch = list(islice(recipes, BACKFILL_BATCH_SIZE))
+            if not batch:
+                break
+            outdated = [
+                recipe for recipe in batch if image_variants_outdated(recipe)
+            ]
+            enqueue_image_tasks(outdated)
+            queued += len(outdated)
+        self.stdout.write(f"Поставлено заданий: {queued}")
+
+    def process_next(self):
+        return process_next_image_task()
+
+    def requeue_stale(self):
+        requeue_stale_image_tasks()
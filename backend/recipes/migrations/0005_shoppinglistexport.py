@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 20:46
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_alter_shoppingcart_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='compositionofdish',
+            name='amount',
+            field=models.SmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, message='Минимальное количество ингредиетов в блюде должно быть не меньше 1.'), django.core.validators.MaxValueValidator(10000, message='Максимально количество ингредиетов в блюде не превышает 10000.')], verbose_name='Количество ингредиентов'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoppingcart', to='recipes.recipe', verbose_name='Рецепты пользователей'),
+        ),
+        migrations.CreateModel(
+            name='ShoppingListExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='Состояние задания')),
+                ('file', models.FileField(blank=True, upload_to='shopping_lists', verbose_name='Файл списка покупок')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка выполнения')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания задания')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='Начало выполнения')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Окончание выполнения')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_exports', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Выгрузка списка покупок',
+                'verbose_name_plural': 'Выгрузки списков покупок',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglistexport',
+            index=models.Index(fields=['status', 'created'], name='export_status_created_idx'),
+        ),
+    ]
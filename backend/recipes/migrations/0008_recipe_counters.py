@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 22:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    for field, related in (
+        ("favorites_count", apps.get_model("recipes", "Favorite")),
+        ("in_carts_count", apps.get_model("recipes", "ShoppingCart")),
+    ):
+        Recipe.objects.update(
+            **{
+                field: Coalesce(
+                    Subquery(
+                        related.objects.filter(recipe=OuterRef("pk"))
+                        .order_by()
+                        .values("recipe")
+                        .annotate(total=Count("pk"))
+                        .values("total")
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В списках покупок"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2 on 2026-10-18 22:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Количество рецептов в одном INSERT при заполнении рейтингов.
+BATCH_SIZE = 1000
+
+
+def fill_popular(apps, schema_editor):
+    """Рейтинг popular для рецептов, добавленных в избранное до появления
+    журнала событий. trending не заполняется: время добавления в
+    избранное и списки покупок не хранилось."""
+
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeRanking = apps.get_model("recipes", "RecipeRanking")
+    RecipeRanking.objects.bulk_create(
+        (
+            RecipeRanking(recipe_id=recipe_id, popular=favorites_count)
+            for recipe_id, favorites_count in Recipe.objects.filter(
+                favorites_count__gt=0
+            ).values_list("id", "favorites_count").iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='Рецепт')),
+                ('added', models.BooleanField(verbose_name='Добавление')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата события')),
+            ],
+            options={
+                'verbose_name': 'Событие рецепта',
+                'verbose_name_plural': 'События рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular', models.PositiveIntegerField(default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(blank=True, null=True, verbose_name='Набирает популярность')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата пересчета')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reciperanking',
+            index=models.Index(fields=['-popular'], name='ranking_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperanking',
+            index=models.Index(fields=['-trending'], name='ranking_trending_idx'),
+        ),
+        migrations.RunPython(fill_popular, migrations.RunPython.noop),
+    ]
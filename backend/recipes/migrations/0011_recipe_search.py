@@ -0,0 +1,61 @@
+# Generated by Django 3.2 on 2026-10-18 23:50
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Колонка search_vector есть только в PostgreSQL и не описана в модели:
+# ее заполняет триггер, а Django не читает ее при загрузке рецептов.
+CREATE_SEARCH = """
+ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector;
+
+CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(text, '')), 'B');
+
+CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector);
+CREATE INDEX recipe_name_trgm_idx
+    ON recipes_recipe USING gin (name gin_trgm_ops);
+"""
+
+DROP_SEARCH = """
+DROP INDEX IF EXISTS recipe_name_trgm_idx;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0010_recipe_author_pub_date_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search, drop_search),
+    ]
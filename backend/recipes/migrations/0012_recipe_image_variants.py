@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 23:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии изображения'),
+        ),
+        migrations.CreateModel(
+            name='RecipeImageTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=100, verbose_name='Изображение рецепта')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='Состояние задания')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка выполнения')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания задания')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='Начало выполнения')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Окончание выполнения')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_tasks', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Обработка изображения рецепта',
+                'verbose_name_plural': 'Обработка изображений рецептов',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipeimagetask',
+            index=models.Index(fields=['status', 'created'], name='image_task_status_created_idx'),
+        ),
+    ]
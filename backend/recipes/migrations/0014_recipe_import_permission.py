@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 00:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipeimageupload'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-pub_date',), 'permissions': (('import_recipes', 'Может импортировать рецепты пачками'),), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+    ]
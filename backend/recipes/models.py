@@ -1,11 +1,24 @@
+from uuid import uuid4
+
 from colorfield.fields import ColorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    UniqueConstraint,
+    Value,
+    Window,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 from core.constants import LenghtField
 from core.validators import SlugValidator, ColorValidator
-from users.models import User
+from users.models import Subscriptions, User
 
 
 class Ingredient(models.Model):
@@ -75,6 +88,75 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    @staticmethod
+    def related_prefetches():
+        """Prefetch тегов и состава блюда с ингредиентами для уже
+        полученных рецептов через prefetch_related_objects
+        (RecipeReadListSerializer, только для промахов кэша)."""
+        return (
+            "tags",
+            Prefetch(
+                "composition_list",
+                queryset=CompositionOfDish.objects.select_related(
+                    "ingredient").order_by("ingredient__name"),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами текущего пользователя:
+        is_favorited, is_in_shopping_cart и author_is_subscribed.
+        Флаги считаются подзапросами EXISTS в одном запросе
+        на всю страницу, а не отдельным запросом на каждый рецепт."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=BooleanField()),
+                author_is_subscribed=Value(
+                    False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            author_is_subscribed=Exists(
+                Subscriptions.objects.filter(
+                    user=user, author=OuterRef("author"))
+            ),
+        )
+
+    def latest_for_authors(self, author_ids, limit):
+        """Последние limit рецептов каждого из авторов author_ids
+        одним запросом: ROW_NUMBER() OVER (PARTITION BY author)
+        во вложенном запросе и отбор по номеру строки."""
+        ranked = (
+            self.model.objects.filter(author__in=author_ids)
+            .annotate(
+                recipe_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("author")],
+                    order_by=[F("pub_date").desc(), F("id").desc()],
+                )
+            )
+            .order_by()
+            .values("id", "recipe_rank")
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(
+            id__in=RawSQL(
+                f"SELECT ranked.id FROM ({sql}) ranked "
+                f"WHERE ranked.recipe_rank <= %s",
+                (*params, limit),
+            )
+        )
+
+
 class Recipe(models.Model):
     """Рецепт.Основная модель, у которой есть следующие атрибуты:
     тег рецепта, автор рецепта, ингредиенты рецепта, название рецепта,
@@ -108,6 +190,14 @@ class Recipe(models.Model):
         upload_to="recipes/images",
         help_text="Добавьте рецепт",
     )
+    # Уменьшенные копии изображения (recipes.images):
+    # {"source": имя изображения, "files": {имя копии: путь}}.
+    image_variants = models.JSONField(
+        verbose_name="Уменьшенные копии изображения",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name="Описание рецепта", help_text="Введите Описание рецепта"
     )
@@ -130,11 +220,40 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации рецепта", auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения рецепта", auto_now=True
+    )
+    # Счетчики поддерживаются сигналами (recipes.counters),
+    # пересчитываются командой repair_counters.
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="В избранном", default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name="В списках покупок", default=0, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        # Массовый импорт (POST /api/recipes/bulk_import/) для партнеров.
+        permissions = (
+            ("import_recipes", "Может импортировать рецепты пачками"),
+        )
+        indexes = [
+            # Пагинация по ключу (pub_date, id): RecipePagination.
+            models.Index(
+                fields=("-pub_date", "id"),
+                name="recipe_pub_date_id_idx",
+            ),
+            # Лента подписок: recipes.feed.
+            models.Index(
+                fields=("author", "-pub_date", "id"),
+                name="recipe_author_pub_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -249,3 +368,202 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f"Пользователь {self.user} добавил {self.recipe} в Корзину!"
+
+
+class TaskStatus(models.TextChoices):
+    """Состояние задания в очереди в базе данных (recipes.tasks)."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ShoppingListExport(models.Model):
+    """Задание на выгрузку списка покупок в файл.
+    Задания ставятся в очередь в базе данных и выполняются
+    фоновым обработчиком (команда run_export_worker)."""
+
+    StatusChoices = TaskStatus
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list_exports",
+        verbose_name="Пользователь",
+    )
+    status = models.CharField(
+        verbose_name="Состояние задания",
+        max_length=LenghtField.MAX_LENGHT_EXPORT_STATUS.value,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    file = models.FileField(
+        verbose_name="Файл списка покупок",
+        upload_to="shopping_lists",
+        blank=True,
+    )
+    error = models.TextField(verbose_name="Ошибка выполнения", blank=True)
+    created = models.DateTimeField(
+        verbose_name="Дата создания задания", auto_now_add=True
+    )
+    started = models.DateTimeField(
+        verbose_name="Начало выполнения", null=True, blank=True
+    )
+    finished = models.DateTimeField(
+        verbose_name="Окончание выполнения", null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = "Выгрузка списка покупок"
+        verbose_name_plural = "Выгрузки списков покупок"
+        ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=("status", "created"),
+                name="export_status_created_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"Выгрузка {self.id} пользователя {self.user}: {self.status}"
+
+
+class RecipeActivity(models.Model):
+    """Событие для пересчета рейтингов: рецепт добавлен в избранное
+    или список покупок либо удален оттуда. Журнал разбирается
+    командой refresh_rankings и очищается. recipe_id без внешнего
+    ключа: событие удаления может прийти вместе с удалением рецепта."""
+
+    recipe_id = models.BigIntegerField(verbose_name="Рецепт")
+    added = models.BooleanField(verbose_name="Добавление")
+    created = models.DateTimeField(
+        verbose_name="Дата события", auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = "Событие рецепта"
+        verbose_name_plural = "События рецептов"
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"Рецепт {self.recipe_id}: {self.added}"
+
+
+class RecipeRanking(models.Model):
+    """Рейтинги рецепта для сортировки ordering=popular/trending.
+    popular - количество добавлений в избранное.
+    trending - log2 суммы затухающих весов добавлений в избранное
+    и списки покупок за вычетом удалений (recipes.rankings). Сравнение trending
+    разных рецептов не зависит от текущего времени."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ranking",
+        verbose_name="Рецепт",
+    )
+    popular = models.PositiveIntegerField(
+        verbose_name="Популярность", default=0
+    )
+    trending = models.FloatField(
+        verbose_name="Набирает популярность", null=True, blank=True
+    )
+    updated = models.DateTimeField(
+        verbose_name="Дата пересчета", auto_now=True
+    )
+
+    class Meta:
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинги рецептов"
+        indexes = [
+            models.Index(
+                fields=("-popular",), name="ranking_popular_idx"
+            ),
+            models.Index(
+                fields=("-trending",), name="ranking_trending_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Рейтинг {self.recipe}"
+
+
+class RecipeImageTask(models.Model):
+    """Задание на уменьшенные копии изображения рецепта.
+    Ставится в очередь при сохранении рецепта с новым изображением
+    и выполняется фоновым обработчиком (команда run_image_worker)."""
+
+    StatusChoices = TaskStatus
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_tasks",
+        verbose_name="Рецепт",
+    )
+    image = models.CharField(
+        verbose_name="Изображение рецепта",
+        max_length=LenghtField.MAX_LENGHT_IMAGE_NAME.value,
+    )
+    status = models.CharField(
+        verbose_name="Состояние задания",
+        max_length=LenghtField.MAX_LENGHT_EXPORT_STATUS.value,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    error = models.TextField(verbose_name="Ошибка выполнения", blank=True)
+    created = models.DateTimeField(
+        verbose_name="Дата создания задания", auto_now_add=True
+    )
+    started = models.DateTimeField(
+        verbose_name="Начало выполнения", null=True, blank=True
+    )
+    finished = models.DateTimeField(
+        verbose_name="Окончание выполнения", null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = "Обработка изображения рецепта"
+        verbose_name_plural = "Обработка изображений рецептов"
+        ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=("status", "created"),
+                name="image_task_status_created_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.image}: {self.status}"
+
+
+class RecipeImageUpload(models.Model):
+    """Изображение рецепта, загруженное отдельно от рецепта
+    (POST /api/recipes/upload_image/). Рецепт ссылается на него
+    строкой "upload:<id>" в поле image вместо base64. После создания
+    рецепта запись удаляется, файл остается изображением рецепта."""
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="image_uploads",
+        verbose_name="Пользователь",
+    )
+    image = models.ImageField(
+        verbose_name="Изображение рецепта",
+        upload_to="recipes/images",
+    )
+    created = models.DateTimeField(
+        verbose_name="Дата загрузки", auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = "Загруженное изображение рецепта"
+        verbose_name_plural = "Загруженные изображения рецептов"
+        ordering = ("-created",)
+
+    def __str__(self):
+        return str(self.image)
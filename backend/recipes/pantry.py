@@ -0,0 +1,294 @@
+import time
+from heapq import merge
+from itertools import islice
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import CompositionOfDish, Recipe
+
+# Номер последнего изменения рецептов в общем кэше. Каждый процесс
+# помнит номер, до которого его индекс актуален, и дочитывает журнал.
+PANTRY_SEQ_KEY = "pantry_index:seq"
+# Запись журнала: id рецептов, измененных под этим номером.
+PANTRY_CHANGE_KEY = "pantry_index:change:{seq}"
+PANTRY_CHANGE_TIMEOUT = 60 * 60 * 24
+# При отставании больше чем на столько изменений индекс
+# собирается заново, а не дочитывается по журналу.
+PANTRY_MAX_REPLAY = 1000
+# Индекс собирается заново не реже, чем раз в столько секунд.
+PANTRY_REBUILD_INTERVAL = 60 * 60
+# Максимальное количество рецептов в ответе поиска.
+PANTRY_MAX_RESULTS = 1000
+
+
+class PantryIndex:
+    """Обратный индекс ингредиент -> рецепты в виде битовых множеств.
+    Каждому рецепту выдается номер бита (слот). При сборке слоты идут
+    по возрастанию (время приготовления, id), поэтому рецепты
+    с одинаковым количеством недостающих ингредиентов уже упорядочены.
+    Рецепты, измененные после сборки, получают новые слоты в конце
+    и сортируются при поиске отдельно."""
+
+    def __init__(self):
+        self.postings = {}
+        self.sizes = {}
+        self.slots = []
+        self.slot_of = {}
+        self.ingredients = {}
+        self.sorted_end = 0
+
+    def load(self, recipes, compositions):
+        """Строит индекс по парам (id, cooking_time)
+        и (recipe_id, ingredient_id)."""
+
+        recipes = sorted(recipes, key=lambda row: (row[1], row[0]))
+        self.slots = [(cooking_time, recipe_id)
+                      for recipe_id, cooking_time in recipes]
+        self.slot_of = {
+            recipe_id: slot for slot, (_, recipe_id) in enumerate(self.slots)
+        }
+        self.sorted_end = len(self.slots)
+        ingredients = {recipe_id: [] for recipe_id in self.slot_of}
+        slots = {}
+        for recipe_id, ingredient_id in compositions:
+            if recipe_id in ingredients:
+                ingredients[recipe_id].append(ingredient_id)
+                slots.setdefault(ingredient_id, []).append(
+                    self.slot_of[recipe_id])
+        self.ingredients = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in ingredients.items()
+        }
+        self.postings = {
+            ingredient_id: bitset(ingredient_slots)
+            for ingredient_id, ingredient_slots in slots.items()
+        }
+        sizes = {}
+        for recipe_id, ingredient_ids in self.ingredients.items():
+            sizes.setdefault(len(ingredient_ids), []).append(
+                self.slot_of[recipe_id])
+        self.sizes = {size: bitset(slots) for size, slots in sizes.items()}
+
+    def remove(self, recipe_id):
+        slot = self.slot_of.pop(recipe_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        ingredients = self.ingredients.pop(recipe_id)
+        for ingredient_id in ingredients:
+            self.postings[ingredient_id] &= mask
+        self.sizes[len(ingredients)] &= mask
+        self.slots[slot] = None
+
+    def add(self, recipe_id, cooking_time, ingredients):
+        slot = len(self.slots)
+        bit = 1 << slot
+        self.slots.append((cooking_time, recipe_id))
+        self.slot_of[recipe_id] = slot
+        self.ingredients[recipe_id] = tuple(ingredients)
+        for ingredient_id in ingredients:
+            self.postings[ingredient_id] = (
+                self.postings.get(ingredient_id, 0) | bit)
+        self.sizes[len(ingredients)] = (
+            self.sizes.get(len(ingredients), 0) | bit)
+
+    def search(self, ingredient_ids, limit, max_missing=None):
+        """Рецепты, в которых есть хотя бы один ингредиент из
+        ingredient_ids: [(recipe_id, недостающих ингредиентов)]
+        по возрастанию недостающих, затем времени приготовления.
+        Совпадения считаются побитовым сложением множеств ингредиентов
+        (разряды счетчика - отдельные битовые множества)."""
+
+        planes = []
+        matched_any = 0
+        for ingredient_id in set(ingredient_ids):
+            carry = self.postings.get(ingredient_id, 0)
+            matched_any |= carry
+            for position, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[position], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        matched = {}
+
+        def matched_exactly(count):
+            if count not in matched:
+                mask = matched_any if count < 1 << len(planes) else 0
+                for position, plane in enumerate(planes):
+                    mask &= plane if count >> position & 1 else ~plane
+                matched[count] = mask
+            return matched[count]
+
+        found = []
+        max_size = max(self.sizes, default=0)
+        if max_missing is None:
+            max_missing = max_size
+        for missing in range(min(max_missing, max_size) + 1):
+            bucket = 0
+            for size, recipes in self.sizes.items():
+                if size - missing >= 1:
+                    bucket |= recipes & matched_exactly(size - missing)
+            for recipe_id in self.ordered(bucket, limit - len(found)):
+                found.append((recipe_id, missing))
+            if len(found) >= limit:
+                break
+        return found
+
+    def ordered(self, bucket, limit):
+        """id рецептов из битового множества bucket по возрастанию
+        (время приготовления, id), не больше limit."""
+
+        bits = bin(bucket)[:1:-1]
+        head = []
+        position = bits.find("1")
+        while position != -1 and position < self.sorted_end:
+            head.append(self.slots[position])
+            if len(head) == limit:
+                break
+            position = bits.find("1", position + 1)
+        tail = []
+        position = bits.find("1", self.sorted_end)
+        while position != -1:
+            tail.append(self.slots[position])
+            position = bits.find("1", position + 1)
+        return [
+            recipe_id
+            for _, recipe_id in islice(merge(head, sorted(tail)), limit)
+        ]
+
+
+def bitset(slots):
+    """Битовое множество (int) из номеров битов."""
+
+    if not slots:
+        return 0
+    data = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        data[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(data, "little")
+
+
+def load_recipes(recipe_ids=None):
+    """Строки рецептов и состава блюда для индекса из базы."""
+
+    recipes = Recipe.objects.order_by()
+    compositions = CompositionOfDish.objects.order_by()
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+        compositions = compositions.filter(recipe_id__in=recipe_ids)
+    return (
+        list(recipes.values_list("id", "cooking_time")),
+        compositions.values_list("recipe_id", "ingredient_id").iterator(),
+    )
+
+
+class SharedPantryIndex:
+    """Индекс процесса, согласованный с остальными процессами через
+    журнал изменений в общем кэше. Изменения своего процесса видны
+    сразу, чужие - после коммита транзакции, в которой они сделаны."""
+
+    def __init__(self):
+        self.index = None
+        self.seq = None
+        self.built = 0
+        self.pending = set()
+        self.lock = Lock()
+
+    def clear(self):
+        with self.lock:
+            self.index = None
+            self.pending.clear()
+
+    def mark_changed(self, recipe_ids):
+        recipe_ids = set(recipe_ids)
+        with self.lock:
+            self.pending |= recipe_ids
+        transaction.on_commit(lambda: publish_changes(recipe_ids))
+
+    def get(self):
+        with self.lock:
+            shared_seq = get_pantry_seq()
+            if (
+                self.index is None
+                or shared_seq < self.seq
+                or shared_seq - self.seq > PANTRY_MAX_REPLAY
+                or time.monotonic() - self.built > PANTRY_REBUILD_INTERVAL
+            ):
+                self.rebuild(shared_seq)
+                return self.index
+            changed = set(self.pending)
+            if shared_seq > self.seq:
+                changes = cache.get_many(
+                    [
+                        PANTRY_CHANGE_KEY.format(seq=seq)
+                        for seq in range(self.seq + 1, shared_seq + 1)
+                    ]
+                )
+                if len(changes) < shared_seq - self.seq:
+                    self.rebuild(shared_seq)
+                    return self.index
+                for recipe_ids in changes.values():
+                    changed.update(recipe_ids)
+            if changed:
+                self.refresh(changed)
+            self.seq = shared_seq
+            self.pending.clear()
+            return self.index
+
+    def rebuild(self, seq):
+        index = PantryIndex()
+        index.load(*load_recipes())
+        self.index = index
+        self.seq = seq
+        self.built = time.monotonic()
+        self.pending.clear()
+
+    def refresh(self, recipe_ids):
+        recipes, compositions = load_recipes(recipe_ids)
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in compositions:
+            ingredients[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            self.index.remove(recipe_id)
+        for recipe_id, cooking_time in recipes:
+            self.index.add(recipe_id, cooking_time, ingredients[recipe_id])
+
+
+def get_pantry_seq():
+    seq = cache.get(PANTRY_SEQ_KEY)
+    if seq is None:
+        cache.add(PANTRY_SEQ_KEY, 0, None)
+        seq = cache.get(PANTRY_SEQ_KEY, 0)
+    return seq
+
+
+def publish_changes(recipe_ids):
+    """Записывает изменение рецептов в журнал для других процессов."""
+
+    get_pantry_seq()
+    seq = cache.incr(PANTRY_SEQ_KEY)
+    cache.set(
+        PANTRY_CHANGE_KEY.format(seq=seq),
+        list(recipe_ids),
+        PANTRY_CHANGE_TIMEOUT,
+    )
+
+
+pantry_index = SharedPantryIndex()
+
+
+def mark_recipes_changed(recipe_ids):
+    """Состав блюда или время приготовления рецептов изменились."""
+
+    pantry_index.mark_changed(recipe_ids)
+
+
+def search_pantry(ingredient_ids, max_missing=None,
+                  limit=PANTRY_MAX_RESULTS):
+    """Что можно приготовить из ингредиентов ingredient_ids:
+    [(recipe_id, недостающих ингредиентов)]."""
+
+    return pantry_index.get().search(ingredient_ids, limit, max_missing)
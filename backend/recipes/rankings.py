@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from math import log2
+
+from django.db import transaction
+from django.utils import timezone as django_timezone
+
+from recipes.models import Recipe, RecipeActivity, RecipeRanking
+
+# Вес добавления в избранное или список покупок уменьшается вдвое
+# за TRENDING_HALF_LIFE. Веса хранятся в виде показателя степени
+# двойки относительно TRENDING_EPOCH, поэтому старые рейтинги
+# не нужно пересчитывать со временем. Удаление из избранного или списка
+# покупок вычитает вес, который имело бы добавление в момент удаления.
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = timedelta(days=1)
+# Количество событий или рецептов, обрабатываемых за один проход.
+RANKING_BATCH_SIZE = 1000
+
+
+def trending_weight(moment):
+    """log2 веса события в момент moment."""
+
+    return (moment - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+
+
+def log2_sum(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения.
+    None означает пустую сумму."""
+
+    if first is None:
+        return second
+    if second is None:
+        return first
+    high, low = max(first, second), min(first, second)
+    return high + log2(1 + 2 ** (low - high))
+
+
+def log2_difference(first, second):
+    """log2(2 ** first - 2 ** second). Сумма весов не уходит
+    ниже нуля: если вычитаемое не меньше, сумма пустая (None)."""
+
+    if first is None or second >= first:
+        return None
+    return first + log2(1 - 2 ** (second - first))
+
+
+def refresh_rankings(batch_size=RANKING_BATCH_SIZE):
+    """Разбирает очередную пачку журнала RecipeActivity и обновляет
+    рейтинги только затронутых рецептов. Возвращает количество
+    обработанных событий. Рассчитано на один обработчик."""
+
+    with transaction.atomic():
+        events = list(
+            RecipeActivity.objects.values_list(
+                "id", "recipe_id", "added", "created")[:batch_size]
+        )
+        if not events:
+            return 0
+        favorites = dict(
+            Recipe.objects.filter(
+                id__in={event[1] for event in events}
+            ).values_list("id", "favorites_count")
+        )
+        rankings = RecipeRanking.objects.in_bulk(list(favorites))
+        now = django_timezone.now()
+        created = {
+            recipe_id: RecipeRanking(recipe_id=recipe_id, updated=now)
+            for recipe_id in favorites
+            if recipe_id not in rankings
+        }
+        for _, recipe_id, added, moment in events:
+            # События удаленных рецептов пропускаются.
+            ranking = rankings.get(recipe_id) or created.get(recipe_id)
+            if ranking is None:
+                continue
+            change = log2_sum if added else log2_difference
+            ranking.trending = change(
+                ranking.trending, trending_weight(moment))
+        for recipe_id, favorites_count in favorites.items():
+            ranking = rankings.get(recipe_id) or created[recipe_id]
+            ranking.popular = favorites_count
+            ranking.updated = now
+        RecipeRanking.objects.bulk_create(created.values())
+        RecipeRanking.objects.bulk_update(
+            rankings.values(), ("popular", "trending", "updated"))
+        RecipeActivity.objects.filter(
+            id__in=[event[0] for event in events]).delete()
+    return len(events)
+
+
+def rebuild_popular(batch_size=RANKING_BATCH_SIZE):
+    """Заполняет popular для всех рецептов по Recipe.favorites_count.
+    Нужна один раз для рецептов, добавленных в избранное до появления
+    журнала событий. Возвращает количество рецептов."""
+
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "favorites_count")[:batch_size]
+        )
+        if not batch:
+            return total
+        with transaction.atomic():
+            rankings = RecipeRanking.objects.in_bulk(
+                [recipe_id for recipe_id, _ in batch])
+            now = django_timezone.now()
+            created = []
+            for recipe_id, favorites_count in batch:
+                ranking = rankings.get(recipe_id)
+                if ranking is None:
+                    created.append(
+                        RecipeRanking(
+                            recipe_id=recipe_id,
+                            popular=favorites_count,
+                            updated=now,
+                        )
+                    )
+                    continue
+                ranking.popular = favorites_count
+                ranking.updated = now
+            RecipeRanking.objects.bulk_create(created)
+            RecipeRanking.objects.bulk_update(
+                rankings.values(), ("popular", "updated"))
+        total += len(batch)
+        last_id = batch[-1][0]
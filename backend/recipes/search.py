@@ -0,0 +1,65 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+# Конфигурация полнотекстового поиска PostgreSQL.
+SEARCH_CONFIG = "russian"
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под поисковую строку, по убыванию
+    релевантности. На PostgreSQL - полнотекстовый поиск по колонке
+    search_vector (миграция 0011_recipe_search) и поиск по триграммам
+    названия для запросов с опечатками. На других базах - поиск
+    всех слов запроса как подстрок названия или описания (в SQLite
+    без учета регистра только для латиницы)."""
+
+    query = query.strip()
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor == "postgresql":
+        return search_postgresql(queryset, query)
+    return search_simple(queryset, query)
+
+
+def search_postgresql(queryset, query):
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.alias(
+            search_vector=RawSQL(
+                '"recipes_recipe"."search_vector"',
+                [],
+                output_field=SearchVectorField(),
+            )
+        )
+        .annotate(
+            search_rank=SearchRank(F("search_vector"), search_query),
+            similarity=TrigramSimilarity("name", query),
+        )
+        .filter(Q(search_vector=search_query) | Q(name__trigram_similar=query))
+        .order_by("-search_rank", "-similarity", "-pub_date", "id")
+    )
+
+
+def search_simple(queryset, query):
+    condition = Q()
+    for word in query.split():
+        condition &= Q(name__icontains=word) | Q(text__icontains=word)
+    return (
+        queryset.filter(condition)
+        .annotate(
+            search_rank=Case(
+                When(name__icontains=query, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-search_rank", "-pub_date", "id")
+    )
@@ -0,0 +1,153 @@
+import io
+from functools import lru_cache
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db.models import F, Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import CompositionOfDish, ShoppingCart
+
+# Ключ версии корзины пользователя. Версия меняется при любом
+# изменении корзины или состава блюд рецептов из корзины.
+CART_VERSION_KEY = "shopping_cart_version:{user_id}"
+# Ключ готового PDF списка покупок для конкретной версии корзины.
+SHOPPING_LIST_PDF_KEY = "shopping_cart_pdf:{user_id}:{version}"
+# Время жизни готового PDF в кэше, секунды.
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+# PDF больше этого размера, байты, не кэшируется.
+SHOPPING_LIST_CACHE_MAX_SIZE = 1024 * 1024
+# Размер временного файла PDF в памяти, после которого он уходит на диск.
+SHOPPING_LIST_SPOOL_SIZE = 256 * 1024
+
+SHOPPING_LIST_TITLE = "Foodgram - Список покупок:"
+
+# Параметры страницы PDF.
+FONT_NAME = "DejaVuSans"
+FONT_FILE = "DejaVuSans.ttf"
+FONT_SIZE = 14
+LINE_HEIGHT = 20
+PAGE_MARGIN = 50
+
+
+def get_cart_version(user_id):
+    """Текущая версия корзины пользователя.
+    Если версии в кэше нет, создается новая, поэтому после вытеснения
+    ключа из кэша старый PDF уже не может быть отдан. Версия хранится
+    в общем кэше (settings.CACHES), и ее изменение видят все процессы."""
+
+    key = CART_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key)
+    return version
+
+
+def bump_cart_versions(user_ids):
+    """Меняет версии корзин пользователей, делая их PDF устаревшими."""
+
+    cache.set_many(
+        {
+            CART_VERSION_KEY.format(user_id=user_id): uuid4().hex
+            for user_id in set(user_ids)
+        },
+        None,
+    )
+
+
+def bump_recipe_cart_versions(recipe_ids):
+    """Меняет версии корзин всех пользователей,
+    у которых в корзине есть рецепты recipe_ids."""
+
+    bump_cart_versions(
+        ShoppingCart.objects.filter(recipe__in=recipe_ids)
+        .values_list("user_id", flat=True)
+    )
+
+
+def get_shopping_list(user):
+    """Ингредиенты рецептов из корзины пользователя,
+    просуммированные одним агрегирующим запросом."""
+
+    return (
+        CompositionOfDish.objects.filter(recipe__shoppingcart__user=user)
+        .values(
+            name=F("ingredient__name"),
+            measurement_unit=F("ingredient__measurement_unit"),
+        )
+        .annotate(total_amount=Sum("amount"))
+        .order_by("name")
+    )
+
+
+def format_shopping_list(buy_list):
+    """Строки текста списка покупок с заголовком."""
+
+    return chain(
+        [SHOPPING_LIST_TITLE],
+        (
+            f"{item['name']}, {item['total_amount']} "
+            f"{item['measurement_unit']}"
+            for item in buy_list
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Регистрирует шрифт с кириллицей один раз на процесс."""
+
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_FILE))
+
+
+def render_shopping_list_pdf(lines, output):
+    """Пишет строки списка покупок PDF-файлом в файловый объект output.
+    Длинные строки переносятся по ширине страницы,
+    при заполнении страницы начинается новая."""
+
+    register_font()
+    page_width, page_height = A4
+    text_width = page_width - 2 * PAGE_MARGIN
+    top = page_height - PAGE_MARGIN
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setFont(FONT_NAME, FONT_SIZE)
+    y = top
+    for line in lines:
+        for part in simpleSplit(line, FONT_NAME, FONT_SIZE, text_width):
+            if y < PAGE_MARGIN:
+                pdf.showPage()
+                pdf.setFont(FONT_NAME, FONT_SIZE)
+                y = top
+            pdf.drawString(PAGE_MARGIN, y, part)
+            y -= LINE_HEIGHT
+    pdf.showPage()
+    pdf.save()
+
+
+def get_shopping_list_pdf(user):
+    """PDF списка покупок в виде открытого файла для потоковой отдачи.
+    Файл берется из кэша по версии корзины и пересобирается только
+    после ее изменения. PDF собирается во временный файл, который
+    при большом размере уходит на диск, а не копируется в памяти."""
+
+    key = SHOPPING_LIST_PDF_KEY.format(
+        user_id=user.id, version=get_cart_version(user.id))
+    pdf = cache.get(key)
+    if pdf is not None:
+        return io.BytesIO(pdf)
+    output = SpooledTemporaryFile(max_size=SHOPPING_LIST_SPOOL_SIZE)
+    render_shopping_list_pdf(
+        format_shopping_list(get_shopping_list(user)), output)
+    if output.tell() <= SHOPPING_LIST_CACHE_MAX_SIZE:
+        output.seek(0)
+        cache.set(key, output.read(), SHOPPING_LIST_CACHE_TIMEOUT)
+    output.seek(0)
+    return output
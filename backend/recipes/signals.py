@@ -0,0 +1,163 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.catalogue import (
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    bump_catalogue_version,
+)
+from recipes.counters import COUNTERS, change_counter
+from recipes.feed import drop_feed, update_feeds
+from recipes.images import request_image_variants
+from recipes.models import (
+    CompositionOfDish,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeActivity,
+    ShoppingCart,
+    Tag,
+)
+from recipes.pantry import mark_recipes_changed
+from recipes.shopping_list import (
+    bump_cart_versions,
+    bump_recipe_cart_versions,
+)
+from users.models import Subscriptions
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Изменилась корзина пользователя."""
+
+    bump_cart_versions([instance.user_id])
+
+
+@receiver(post_save, sender=CompositionOfDish)
+@receiver(post_delete, sender=CompositionOfDish)
+def composition_changed(sender, instance, **kwargs):
+    """Изменился состав блюда рецепта, который может быть в корзинах."""
+
+    bump_recipe_cart_versions([instance.recipe_id])
+    mark_recipes_changed([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Состав блюда изменен через Recipe.ingredients (add/remove/clear)."""
+
+    recipe_ids = None
+    if reverse and action == "pre_clear":
+        recipe_ids = list(instance.recipes.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        recipe_ids = pk_set if reverse else [instance.pk]
+    if recipe_ids:
+        bump_recipe_cart_versions(recipe_ids)
+        mark_recipes_changed(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Рецепт создан, изменен или удален: индекс "что приготовить"."""
+
+    mark_recipes_changed([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    """Новое изображение рецепта: задание на уменьшенные копии."""
+
+    request_image_variants(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    """Изменились название или единица измерения ингредиента."""
+
+    bump_catalogue_version(INGREDIENTS_VERSION_KEY)
+    if not created:
+        bump_recipe_cart_versions(instance.recipes.values("pk"))
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    """Ингредиент удален из справочника."""
+
+    bump_catalogue_version(INGREDIENTS_VERSION_KEY)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Изменился справочник тегов."""
+
+    bump_catalogue_version(TAGS_VERSION_KEY)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+def counted_created(sender, instance, created, **kwargs):
+    """Новая строка увеличивает счетчик у рецепта или автора."""
+
+    if created:
+        change_counted(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+def counted_deleted(sender, instance, **kwargs):
+    """Удаленная строка уменьшает счетчик у рецепта или автора."""
+
+    change_counted(sender, instance, -1)
+
+
+def change_counted(sender, instance, delta):
+    for model, field, counted_model, relation in COUNTERS:
+        if counted_model is sender:
+            change_counter(
+                model, getattr(instance, f"{relation}_id"), field, delta)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def activity_added(sender, instance, created, **kwargs):
+    """Событие для рейтингов: рецепт добавлен в избранное или корзину."""
+
+    if created:
+        RecipeActivity.objects.create(recipe_id=instance.recipe_id, added=True)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def activity_removed(sender, instance, **kwargs):
+    """Событие для рейтингов: рецепт удален из избранного или корзины."""
+
+    RecipeActivity.objects.create(recipe_id=instance.recipe_id, added=False)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Новый рецепт попадает в готовые ленты подписчиков автора."""
+
+    if created:
+        update_feeds(instance, added=True)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_unpublished(sender, instance, **kwargs):
+    """Удаленный рецепт убирается из готовых лент."""
+
+    update_feeds(instance, added=False)
+
+
+@receiver(post_save, sender=Subscriptions)
+@receiver(post_delete, sender=Subscriptions)
+def subscriptions_changed(sender, instance, **kwargs):
+    """Изменились подписки пользователя."""
+
+    drop_feed(instance.user_id)
@@ -0,0 +1,122 @@
+import time
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.models import TaskStatus
+
+
+def claim_next_task(queryset):
+    """Забирает из очереди самое старое ожидающее задание
+    и возвращает его, загруженное через queryset.
+    На PostgreSQL строки блокируются через SELECT ... FOR UPDATE
+    SKIP LOCKED, поэтому обработчики не ждут друг друга. Условный
+    UPDATE по статусу защищает от двойного захвата на базах без
+    блокировок строк (SQLite), где транзакция не нужна и только
+    приводит к ошибкам блокировки базы при нескольких обработчиках."""
+
+    model = queryset.model
+    locking = connection.features.has_select_for_update
+    with transaction.atomic() if locking else nullcontext():
+        candidates = (
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status=TaskStatus.PENDING)
+            .order_by("created")
+            .values_list("id", flat=True)[:10]
+        )
+        for task_id in candidates:
+            claimed = model.objects.filter(
+                id=task_id, status=TaskStatus.PENDING
+            ).update(status=TaskStatus.RUNNING, started=timezone.now())
+            if claimed:
+                return queryset.get(id=task_id)
+    return None
+
+
+def requeue_stale_tasks(model, timeout):
+    """Возвращает в очередь задания, зависшие в работе дольше timeout
+    (обработчик упал)."""
+
+    return model.objects.filter(
+        status=TaskStatus.RUNNING, started__lt=timezone.now() - timeout
+    ).update(status=TaskStatus.PENDING, started=None)
+
+
+class WorkerCommand(BaseCommand, metaclass=ABCMeta):
+    """Обработчик очереди заданий в базе данных. Внешний брокер
+    не нужен: задания забираются из таблицы пулом потоков в одном
+    процессе. Наследники задают process_next (выполняет одно задание,
+    возвращает его или None) и requeue_stale."""
+
+    # Название задания в выводе команды.
+    task_label = "Задание"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Количество потоков-обработчиков.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами пустой очереди, секунды.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить задания, которые уже в очереди, и завершиться.",
+        )
+
+    @abstractmethod
+    def process_next(self):
+        """Выполняет одно задание из очереди.
+        Возвращает задание или None, если очередь пуста."""
+
+    @abstractmethod
+    def requeue_stale(self):
+        """Возвращает в очередь задания, зависшие в работе."""
+
+    def handle(self, *args: Any, **options: Any):
+        self.requeue_stale()
+        workers = max(options["workers"], 1)
+        if workers == 1:
+            self.work(options["poll_interval"], options["once"])
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    self.work_in_thread,
+                    options["poll_interval"],
+                    options["once"],
+                )
+                for _ in range(workers)
+            ]
+            for future in futures:
+                future.result()
+
+    def work_in_thread(self, poll_interval, once):
+        """У каждого потока свое соединение с базой данных."""
+
+        try:
+            self.work(poll_interval, once)
+        finally:
+            connection.close()
+
+    def work(self, poll_interval, once):
+        while True:
+            task = self.process_next()
+            if task is not None:
+                self.stdout.write(
+                    f"{self.task_label} {task.id}: {task.status}")
+                continue
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,250 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.catalogue import (
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    get_catalogue_version,
+    version_stamps,
+)
+from recipes.counters import repair_counters
+from recipes.models import (
+    CompositionOfDish,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.pantry import pantry_index
+from users.models import Subscriptions, User
+
+# Размер тестового набора данных: тысячи рецептов, сотни авторов,
+# избранное и корзины у многих пользователей.
+AUTHORS_COUNT = 300
+RECIPES_COUNT = 3000
+INGREDIENTS_COUNT = 500
+INGREDIENTS_PER_RECIPE = 5
+FAVORITES_PER_USER = 10
+READER_FAVORITES = 500
+READER_CART = 50
+READER_SUBSCRIPTIONS = 150
+
+# Запросы к таблице кэша (DatabaseCache, как в infra) в бюджетах:
+# чтение ключа - один SELECT; запись - COUNT(*) для вытеснения,
+# SELECT и INSERT/UPDATE внутри точки сохранения.
+CACHE_READ = 1
+CACHE_WRITE = 5
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def seed_dataset():
+    """Заполняет базу реалистичным набором данных пачками bulk_create."""
+
+    password = make_password("Foodgram-pass-1")
+    User.objects.bulk_create(
+        User(
+            email=f"author{number}@foodgram.ru",
+            username=f"author{number}",
+            first_name="Автор",
+            last_name="Рецептов",
+            password=password,
+        )
+        for number in range(AUTHORS_COUNT)
+    )
+    reader = User.objects.create(
+        email="reader@foodgram.ru",
+        username="reader",
+        first_name="Читатель",
+        last_name="Рецептов",
+        password=password,
+    )
+    authors = list(User.objects.exclude(pk=reader.pk).order_by("id"))
+
+    Tag.objects.bulk_create(
+        Tag(name=name, slug=slug, color=color)
+        for name, slug, color in (
+            ("Завтрак", "breakfast", "#E26C2D"),
+            ("Обед", "lunch", "#49B64E"),
+            ("Ужин", "dinner", "#8775D2"),
+        )
+    )
+    tags = list(Tag.objects.order_by("id"))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"ингредиент {number:04}", measurement_unit="г")
+        for number in range(INGREDIENTS_COUNT)
+    )
+    ingredients = list(Ingredient.objects.order_by("id"))
+
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                author=authors[number % len(authors)],
+                name=f"Рецепт {number}",
+                text="Описание рецепта",
+                cooking_time=number % 120 + 1,
+                image="recipes/images/recipe.jpg",
+            )
+            for number in range(RECIPES_COUNT)
+        ),
+        batch_size=500,
+    )
+    recipes = list(Recipe.objects.order_by("id"))
+
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(
+                recipe_id=recipe.id, tag_id=tags[number % len(tags)].id)
+            for number, recipe in enumerate(recipes)
+        ),
+        batch_size=1000,
+    )
+    CompositionOfDish.objects.bulk_create(
+        (
+            CompositionOfDish(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (number + shift * 7) % len(ingredients)],
+                amount=shift + 1,
+            )
+            for number, recipe in enumerate(recipes)
+            for shift in range(INGREDIENTS_PER_RECIPE)
+        ),
+        batch_size=1000,
+    )
+    Favorite.objects.bulk_create(
+        (
+            Favorite(
+                user=author,
+                recipe=recipes[(number * 37 + shift) % len(recipes)],
+            )
+            for number, author in enumerate(authors)
+            for shift in range(FAVORITES_PER_USER)
+        ),
+        batch_size=1000,
+    )
+    Favorite.objects.bulk_create(
+        Favorite(user=reader, recipe=recipe)
+        for recipe in recipes[:READER_FAVORITES]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=reader, recipe=recipe)
+        for recipe in recipes[-READER_CART:]
+    )
+    Subscriptions.objects.bulk_create(
+        Subscriptions(user=reader, author=author)
+        for author in authors[:READER_SUBSCRIPTIONS]
+    )
+    # bulk_create не отправляет сигналы, счетчики считаются заново.
+    repair_counters()
+    return SimpleNamespace(
+        reader_id=reader.id,
+        reader_email=reader.email,
+        reader_token=Token.objects.create(user=reader).key,
+        author_id=authors[0].id,
+        recipe_id=recipes[0].id,
+        tag_id=tags[0].id,
+        tag_slug=tags[0].slug,
+        ingredient_id=ingredients[0].id,
+    )
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Тестовая база с таблицей кэша (DatabaseCache)."""
+
+    with django_db_blocker.unblock():
+        call_command("createcachetable")
+
+
+@pytest.fixture(scope="session")
+def dataset(django_db_setup, django_db_blocker):
+    """Набор данных создается один раз на всю сессию тестов."""
+
+    with django_db_blocker.unblock():
+        return seed_dataset()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(django_db_setup, django_db_blocker):
+    """Кэш не откатывается вместе с транзакцией теста.
+    Версии справочников хранятся в общем кэше бессрочно, в работающей
+    системе они всегда есть: тест начинается с ними, но процесс еще
+    не читал их (каждую версию тест читает из таблицы кэша сам)."""
+
+    with django_db_blocker.unblock():
+        cache.clear()
+        version_stamps.clear()
+        for key in (TAGS_VERSION_KEY, INGREDIENTS_VERSION_KEY):
+            get_catalogue_version(key)
+    version_stamps.clear()
+    pantry_index.clear()
+
+
+@pytest.fixture
+def anon_client(db):
+    return APIClient()
+
+
+@pytest.fixture
+def reader_client(db, dataset):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {dataset.reader_token}")
+    return client
+
+
+def format_queries_report(queries, budget, label):
+    """Читаемый отчет о превышении бюджета запросов:
+    повторяющиеся запросы (вероятный N+1) и полный список."""
+
+    sql = [query["sql"] for query in queries]
+    repeated = Counter(SQL_LITERALS.sub("?", statement) for statement in sql)
+    lines = [
+        f"{label}: выполнено {len(sql)} SQL-запросов "
+        f"при бюджете {budget} (+{len(sql) - budget}).",
+        "",
+        "Повторяющиеся запросы (вероятный N+1):",
+    ]
+    duplicates = [
+        f"  {count}x {statement}"
+        for statement, count in repeated.most_common()
+        if count > 1
+    ]
+    lines.extend(duplicates or ["  нет"])
+    lines.extend(["", "Все запросы:"])
+    lines.extend(
+        f"  {number:>3}. {statement}"
+        for number, statement in enumerate(sql, start=1)
+    )
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер: падает, если внутри блока выполнено
+    больше SQL-запросов, чем разрешено бюджетом."""
+
+    @contextmanager
+    def check(budget, label=""):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        if len(context.captured_queries) > budget:
+            pytest.fail(
+                format_queries_report(
+                    context.captured_queries, budget, label),
+                pytrace=False,
+            )
+
+    return check
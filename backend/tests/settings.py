@@ -0,0 +1,38 @@
+"""Настройки для прогона тестов.
+По умолчанию тесты идут на SQLite в памяти и не требуют сети.
+Для прогона на локальном PostgreSQL: TEST_DB_ENGINE=postgresql pytest
+(параметры подключения берутся из тех же переменных, что и в settings)."""
+
+import os
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+
+if os.getenv("TEST_DB_ENGINE", "sqlite3") == "sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    }
+
+# Тот же общий кэш, что и в infra: бюджеты запросов учитывают
+# обращения к таблице кэша. CACHE_BACKEND меняет бэкенд, как в settings.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram_cache"),
+    }
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "WARNING"},
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="foodgram-media-")
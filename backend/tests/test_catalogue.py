@@ -0,0 +1,64 @@
+from django.core.cache import cache
+
+from recipes import catalogue
+from recipes.models import Tag
+
+TAGS_URL = "/api/tags/"
+
+
+def test_tags_are_served_from_process_cache(anon_client, query_budget):
+    first = anon_client.get(TAGS_URL).json()
+    # Ни справочника, ни его версии из таблицы кэша.
+    with query_budget(0, f"GET {TAGS_URL} (повторно)"):
+        second = anon_client.get(TAGS_URL).json()
+    assert second == first
+
+
+def test_version_from_other_process_is_read_after_interval(db, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(catalogue.time, "monotonic", lambda: now)
+    version = catalogue.get_catalogue_version(catalogue.TAGS_VERSION_KEY)
+    # Другой процесс меняет версию в общем кэше.
+    cache.set(catalogue.TAGS_VERSION_KEY, "other", None)
+    assert catalogue.get_catalogue_version(
+        catalogue.TAGS_VERSION_KEY) == version
+    now += catalogue.CATALOGUE_VERSION_CHECK_INTERVAL
+    assert catalogue.get_catalogue_version(
+        catalogue.TAGS_VERSION_KEY) == "other"
+
+
+def test_tag_change_invalidates_cache(reader_client, dataset):
+    reader_client.get(TAGS_URL)
+    Tag.objects.filter(id=dataset.tag_id).get().delete()
+    ids = [tag["id"] for tag in reader_client.get(TAGS_URL).json()]
+    assert dataset.tag_id not in ids
+
+
+def test_process_cache_expires_without_version_change(db, monkeypatch):
+    cache = catalogue.CatalogueCache(catalogue.TAGS_VERSION_KEY, 8, ttl=60)
+    now = 1000.0
+    monkeypatch.setattr(catalogue.time, "monotonic", lambda: now)
+    assert cache.get_or_set("key", lambda: "old") == "old"
+    assert cache.get_or_set("key", lambda: "new") == "old"
+    now += 60
+    assert cache.get_or_set("key", lambda: "new") == "new"
+
+
+def test_recipe_with_unknown_tag_is_rejected(reader_client, dataset):
+    response = reader_client.post(
+        "/api/recipes/",
+        {
+            "tags": [dataset.tag_id, 10 ** 6],
+            "ingredients": [{"id": dataset.ingredient_id, "amount": 10}],
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": (
+                "data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAA"
+                "LAAAAAABAAEAAAICRAEAOw=="
+            ),
+        },
+        format="json",
+    )
+    assert response.status_code == 400
+    assert "tags" in response.json()
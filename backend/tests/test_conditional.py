@@ -0,0 +1,43 @@
+from recipes.models import Recipe
+
+RECIPES_URL = "/api/recipes/"
+
+
+def test_recipe_list_not_modified(reader_client, query_budget):
+    response = reader_client.get(RECIPES_URL)
+    etag = response["ETag"]
+    assert response.status_code == 200
+    assert response["Last-Modified"]
+    with query_budget(3, f"GET {RECIPES_URL} (If-None-Match)"):
+        response = reader_client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+def test_recipe_detail_not_modified(anon_client, dataset):
+    url = f"{RECIPES_URL}{dataset.recipe_id}/"
+    etag = anon_client.get(url)["ETag"]
+    response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_etag_depends_on_user_flags(reader_client, anon_client, dataset):
+    url = f"{RECIPES_URL}{dataset.recipe_id}/"
+    etag = reader_client.get(url)["ETag"]
+    assert anon_client.get(url)["ETag"] != etag
+    reader_client.delete(f"{url}favorite/")
+    response = reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["is_favorited"] is False
+    assert response["ETag"] != etag
+
+
+def test_etag_changes_when_recipe_is_updated(anon_client, dataset):
+    url = f"{RECIPES_URL}{dataset.recipe_id}/"
+    etag = anon_client.get(url)["ETag"]
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    recipe.name = "Новое название"
+    recipe.save()
+    response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Новое название"
@@ -0,0 +1,55 @@
+from django.core.management import call_command
+
+from recipes.counters import repair_counters
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+RECIPES_URL = "/api/recipes/"
+
+
+def test_seeded_counters_are_consistent(db, dataset):
+    assert repair_counters() == {
+        "favorites_count": 0,
+        "in_carts_count": 0,
+        "recipes_count": 0,
+    }
+
+
+def test_favorite_and_cart_counters(reader_client, dataset):
+    recipe = Recipe.objects.exclude(
+        favorites__user_id=dataset.reader_id).exclude(
+        shoppingcart__user_id=dataset.reader_id).first()
+    url = f"{RECIPES_URL}{recipe.id}/"
+    reader_client.post(f"{url}favorite/")
+    reader_client.post(f"{url}shopping_cart/")
+    recipe.refresh_from_db()
+    favorites, carts = recipe.favorites_count, recipe.in_carts_count
+    assert favorites == recipe.favorites.count()
+    assert carts == recipe.shoppingcart.count()
+    reader_client.delete(f"{url}favorite/")
+    reader_client.delete(f"{url}shopping_cart/")
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == favorites - 1
+    assert recipe.in_carts_count == carts - 1
+
+
+def test_recipes_count_follows_recipes(db, dataset):
+    author = User.objects.get(id=dataset.author_id)
+    count = author.recipes_count
+    recipe = author.recipes.first()
+    recipe.delete()
+    author.refresh_from_db()
+    assert author.recipes_count == count - 1
+    favorited = Favorite.objects.values_list("recipe_id", flat=True)
+    assert not Recipe.objects.filter(
+        id__in=favorited, favorites_count=0).exists()
+
+
+def test_repair_counters_command(db, dataset):
+    Recipe.objects.filter(id=dataset.recipe_id).update(favorites_count=999)
+    User.objects.filter(id=dataset.author_id).update(recipes_count=0)
+    call_command("repair_counters", "--batch-size", "10")
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    assert recipe.favorites_count == recipe.favorites.count()
+    author = User.objects.get(id=dataset.author_id)
+    assert author.recipes_count == author.recipes.count()
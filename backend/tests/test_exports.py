@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+
+from recipes.models import Favorite, Recipe
+from tests.conftest import CACHE_READ
+
+EXPORT_URL = "/api/recipes/export/"
+
+
+def streamed(response):
+    assert response.status_code == 200
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+def test_export_favorites_ndjson(reader_client, query_budget, dataset):
+    url = f"{EXPORT_URL}?is_favorited=1"
+    # Один запрос на токен, рецепты, теги и состав блюда пачки,
+    # версия справочника тегов из кэша.
+    with query_budget(5 + CACHE_READ, f"GET {url}"):
+        content = streamed(reader_client.get(url))
+    recipes = [json.loads(line) for line in content.splitlines()]
+    assert {recipe["id"] for recipe in recipes} == set(
+        Favorite.objects.filter(user_id=dataset.reader_id)
+        .values_list("recipe_id", flat=True)
+    )
+    assert all(recipe["tags"] and recipe["ingredients"] for recipe in recipes)
+
+
+def test_export_catalogue_csv_is_read_in_chunks(anon_client, query_budget,
+                                                dataset):
+    url = f"{EXPORT_URL}?format=csv"
+    # Три пачки по 1000 рецептов: рецепты, теги и состав на пачку.
+    with query_budget(10, f"GET {url}"):
+        response = anon_client.get(url)
+        content = streamed(response)
+    assert response["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert len(rows) == Recipe.objects.count()
+    assert rows[0]["tags"] and rows[0]["ingredients"]
+
+
+def test_export_csv_error_is_plain_text(anon_client):
+    response = anon_client.get(f"{EXPORT_URL}?format=csv&ordering=bad")
+    assert response.status_code == 400
+    assert response["Content-Type"].startswith("text/csv")
+    assert response.content.decode().startswith("ordering: ")
+
+
+def test_export_recipes_command(tmp_path, db, dataset):
+    path = tmp_path / "recipes.ndjson"
+    call_command(
+        "export_recipes",
+        output=str(path),
+        user=dataset.reader_email,
+        list="cart",
+        chunk_size=7,
+    )
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == Recipe.objects.filter(
+        shoppingcart__user_id=dataset.reader_id).count()
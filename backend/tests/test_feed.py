@@ -0,0 +1,72 @@
+import pytest
+from django.core.cache import cache
+
+from recipes import feed
+from recipes.models import Recipe
+from tests.conftest import CACHE_READ
+from users.models import Subscriptions
+
+FEED_URL = "/api/recipes/feed/"
+
+
+def walk(client, url):
+    ids = []
+    while url:
+        data = client.get(url).json()
+        ids.extend(item["id"] for item in data["results"])
+        url = data["next"]
+    return ids
+
+
+def expected_feed(dataset):
+    return list(
+        Recipe.objects.filter(
+            author__subscribe__user_id=dataset.reader_id
+        ).order_by("-pub_date", "id").values_list("id", flat=True)
+    )
+
+
+@pytest.mark.parametrize("threshold", (1, 10 ** 6))
+def test_feed_order(reader_client, dataset, monkeypatch, threshold):
+    monkeypatch.setattr(feed, "FEED_MATERIALIZE_THRESHOLD", threshold)
+    monkeypatch.setattr(feed, "FEED_CACHE_SIZE", 500)
+    assert walk(reader_client, f"{FEED_URL}?limit=100") == \
+        expected_feed(dataset)
+
+
+def test_feed_page_budget(reader_client, query_budget, dataset):
+    first = reader_client.get(FEED_URL).json()
+    # Авторизация, страница рецептов, теги, состав блюда. Количество
+    # подписок и готовая лента берутся из кэша (одно чтение).
+    with query_budget(4 + CACHE_READ, f"GET {first['next']}"):
+        response = reader_client.get(first["next"])
+    assert len(response.json()["results"]) == 6
+
+
+def test_new_recipe_updates_materialized_feed(reader_client, dataset):
+    reader_client.get(FEED_URL)
+    author_id = Subscriptions.objects.filter(
+        user_id=dataset.reader_id).values_list("author_id", flat=True)[0]
+    recipe = Recipe.objects.filter(author_id=author_id).first()
+    recipe.pk = None
+    recipe.save()
+    # Готовая лента обновлена сигналом, а не собрана заново.
+    cached = cache.get(feed.FEED_KEY.format(user_id=dataset.reader_id))
+    assert cached["items"][0][1] == recipe.id
+    results = reader_client.get(FEED_URL).json()["results"]
+    assert results[0]["id"] == recipe.id
+    recipe.delete()
+    assert reader_client.get(FEED_URL).json()["results"][0]["id"] != \
+        recipe.id
+
+
+def test_unsubscribe_rebuilds_feed(reader_client, dataset):
+    first = reader_client.get(FEED_URL).json()["results"][0]
+    reader_client.delete(f"/api/users/{first['author']['id']}/subscribe/")
+    results = reader_client.get(FEED_URL).json()["results"]
+    assert first["author"]["id"] not in [
+        item["author"]["id"] for item in results]
+
+
+def test_feed_requires_authentication(anon_client):
+    assert anon_client.get(FEED_URL).status_code == 401
@@ -0,0 +1,73 @@
+import base64
+import io
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from recipes.images import IMAGE_VARIANTS
+from recipes.models import Recipe, RecipeImageTask
+from tests.test_recipe_save import RECIPES_URL, recipe_payload
+
+
+def image_payload(size=(640, 480), color="orange"):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return (
+        "data:image/png;base64,"
+        + base64.b64encode(output.getvalue()).decode()
+    )
+
+
+def create_recipe(client, dataset):
+    payload = recipe_payload(dataset, [(dataset.ingredient_id, 1)])
+    payload["image"] = image_payload()
+    response = client.post(RECIPES_URL, payload, format="json")
+    assert response.status_code == 201
+    return response.json()
+
+
+def run_worker():
+    call_command(
+        "run_image_worker", "--workers=1", "--once", stdout=io.StringIO())
+
+
+def test_image_variants_are_built_by_worker(reader_client, dataset):
+    recipe = create_recipe(reader_client, dataset)
+    assert recipe["image_variants"] == {}
+    task = RecipeImageTask.objects.get(recipe_id=recipe["id"])
+    assert task.status == RecipeImageTask.StatusChoices.PENDING
+
+    run_worker()
+
+    task.refresh_from_db()
+    assert task.status == RecipeImageTask.StatusChoices.DONE
+    variants = reader_client.get(
+        f"{RECIPES_URL}{recipe['id']}/").json()["image_variants"]
+    assert set(variants) == set(IMAGE_VARIANTS)
+    assert variants["card_webp"].startswith("http://testserver/media/")
+    for name, path in Recipe.objects.get(
+        id=recipe["id"]
+    ).image_variants["files"].items():
+        width, height, image_format = IMAGE_VARIANTS[name]
+        with default_storage.open(path) as file:
+            image = Image.open(file)
+            assert image.size == (width, height)
+            assert image.format == image_format
+
+
+def test_replaced_image_is_not_overwritten(reader_client, dataset):
+    recipe = create_recipe(reader_client, dataset)
+    payload = recipe_payload(dataset, [(dataset.ingredient_id, 1)])
+    payload["image"] = image_payload(color="green")
+    response = reader_client.patch(
+        f"{RECIPES_URL}{recipe['id']}/", payload, format="json")
+    assert response.status_code == 200
+    assert RecipeImageTask.objects.filter(recipe_id=recipe["id"]).count() == 2
+
+    run_worker()
+
+    saved = Recipe.objects.get(id=recipe["id"])
+    assert saved.image_variants["source"] == saved.image.name
+    assert not RecipeImageTask.objects.exclude(
+        status=RecipeImageTask.StatusChoices.DONE).exists()
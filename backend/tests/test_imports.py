@@ -0,0 +1,197 @@
+import json
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from api import imports
+from recipes.models import (CompositionOfDish, Ingredient, Recipe,
+                            RecipeImageTask, User)
+from tests.test_recipe_save import recipe_payload
+
+IMPORT_URL = "/api/recipes/bulk_import/"
+
+
+def ndjson(lines):
+    return "\n".join(
+        line if isinstance(line, str) else json.dumps(line) for line in lines
+    )
+
+
+@pytest.fixture
+def importer_client(reader_client, dataset):
+    """Читатель с правом массового импорта (партнер)."""
+
+    User.objects.get(id=dataset.reader_id).user_permissions.add(
+        Permission.objects.get(codename="import_recipes"))
+    return reader_client
+
+
+def post_import(client, lines):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(
+            IMPORT_URL, ndjson(lines), content_type="application/x-ndjson")
+    return response, len(context.captured_queries)
+
+
+def test_bulk_import_requires_permission(reader_client, dataset):
+    response, _ = post_import(
+        reader_client,
+        [recipe_payload(dataset, [(dataset.ingredient_id, 1)])],
+    )
+    assert response.status_code == 403
+
+
+def test_bulk_import_reports_errors_per_line(importer_client, dataset):
+    ingredient_ids = list(
+        Ingredient.objects.values_list("id", flat=True)[:3])
+    recipes_count = User.objects.get(id=dataset.reader_id).recipes_count
+    response, _ = post_import(
+        importer_client,
+        [
+            recipe_payload(dataset, [(pk, 2) for pk in ingredient_ids]),
+            "{не json",
+            recipe_payload(dataset, [(10 ** 6, 1)]),
+            "",
+            recipe_payload(dataset, [(ingredient_ids[0], 1)]),
+        ],
+    )
+    assert response.status_code == 201
+    report = response.json()
+    assert [item["line"] for item in report["created"]] == [1, 5]
+    assert [item["line"] for item in report["errors"]] == [2, 3]
+    assert "ingredients" in report["errors"][1]["errors"]
+
+    recipe_id = report["created"][0]["id"]
+    recipe = Recipe.objects.get(id=recipe_id)
+    assert recipe.author_id == dataset.reader_id
+    assert list(recipe.tags.values_list("id", flat=True)) == [dataset.tag_id]
+    assert sorted(
+        CompositionOfDish.objects.filter(recipe=recipe)
+        .values_list("ingredient_id", flat=True)
+    ) == sorted(ingredient_ids)
+    assert (
+        User.objects.get(id=dataset.reader_id).recipes_count
+        == recipes_count + 2
+    )
+
+
+@pytest.mark.skipif(
+    not connection.features.can_return_rows_from_bulk_insert,
+    reason="Без id из bulk_create рецепты сохраняются по одному.",
+)
+def test_bulk_import_queries_do_not_grow_with_recipes(importer_client,
+                                                      dataset):
+    ingredient_ids = list(
+        Ingredient.objects.values_list("id", flat=True)[:30])
+    payloads = [
+        recipe_payload(dataset, [(pk, 1) for pk in ingredient_ids[:number]])
+        for number in range(1, 21)
+    ]
+    _, few = post_import(importer_client, payloads[:2])
+    response, many = post_import(importer_client, payloads)
+    assert len(response.json()["created"]) == 20
+    assert many <= few
+
+
+def test_bulk_import_reports_database_errors(importer_client, dataset,
+                                             monkeypatch):
+    def fail(*args, **kwargs):
+        raise IntegrityError("ошибка")
+
+    monkeypatch.setattr(CompositionOfDish.objects, "bulk_create", fail)
+    recipes_count = Recipe.objects.count()
+    payload = recipe_payload(dataset, [(dataset.ingredient_id, 1)])
+    response, _ = post_import(importer_client, [payload, "[]", payload])
+    assert response.status_code == 400
+    report = response.json()
+    assert report["created"] == []
+    assert [item["line"] for item in report["errors"]] == [1, 2, 3]
+    assert Recipe.objects.count() == recipes_count
+
+
+def test_bulk_import_reports_only_failed_rows(importer_client, dataset,
+                                              monkeypatch):
+    bulk_create = CompositionOfDish.objects.bulk_create
+
+    def fail_on_amount(objs, *args, **kwargs):
+        objs = list(objs)
+        if any(item.amount == 13 for item in objs):
+            raise IntegrityError("ошибка")
+        return bulk_create(objs, *args, **kwargs)
+
+    monkeypatch.setattr(
+        CompositionOfDish.objects, "bulk_create", fail_on_amount)
+    response, _ = post_import(
+        importer_client,
+        [
+            recipe_payload(dataset, [(dataset.ingredient_id, 1)]),
+            recipe_payload(dataset, [(dataset.ingredient_id, 13)]),
+            recipe_payload(dataset, [(dataset.ingredient_id, 2)]),
+        ],
+    )
+    assert response.status_code == 201
+    report = response.json()
+    assert [item["line"] for item in report["created"]] == [1, 3]
+    assert [item["line"] for item in report["errors"]] == [2]
+    assert Recipe.objects.filter(
+        id__in=[item["id"] for item in report["created"]]).count() == 2
+
+
+def test_bulk_import_with_ids_from_bulk_create(importer_client, dataset,
+                                               monkeypatch):
+    """Ветка PostgreSQL: bulk_create возвращает id, сигналы не приходят,
+    побочные эффекты выполняются явно и ровно один раз."""
+
+    bulk_create = Recipe.objects.bulk_create
+
+    def bulk_create_with_ids(objs, *args, **kwargs):
+        objs = bulk_create(objs, *args, **kwargs)
+        ids = Recipe.objects.order_by("-id").values_list(
+            "id", flat=True)[:len(objs)]
+        for recipe, pk in zip(objs, reversed(ids)):
+            recipe.id = pk
+        return objs
+
+    monkeypatch.setattr(imports, "bulk_insert_returns_ids", lambda: True)
+    monkeypatch.setattr(Recipe.objects, "bulk_create", bulk_create_with_ids)
+    recipes_count = User.objects.get(id=dataset.reader_id).recipes_count
+    response, _ = post_import(
+        importer_client,
+        [recipe_payload(dataset, [(dataset.ingredient_id, amount)])
+         for amount in (1, 2, 3)],
+    )
+    assert response.status_code == 201
+    ids = [item["id"] for item in response.json()["created"]]
+    assert sorted(
+        CompositionOfDish.objects.filter(recipe_id__in=ids)
+        .values_list("amount", flat=True)
+    ) == [1, 2, 3]
+    assert (
+        User.objects.get(id=dataset.reader_id).recipes_count
+        == recipes_count + 3
+    )
+    assert sorted(
+        RecipeImageTask.objects.filter(recipe_id__in=ids)
+        .values_list("recipe_id", flat=True)
+    ) == sorted(ids)
+
+
+def test_import_recipes_command(tmp_path, db, dataset):
+    path = tmp_path / "recipes.ndjson"
+    path.write_text(
+        ndjson(
+            [
+                recipe_payload(dataset, [(dataset.ingredient_id, 1)]),
+                "[]",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    reader = User.objects.get(id=dataset.reader_id)
+    recipes_count = reader.recipes_count
+    call_command("import_recipes", str(path), author=reader.email)
+    reader.refresh_from_db()
+    assert reader.recipes_count == recipes_count + 1
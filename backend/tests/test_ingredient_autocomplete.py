@@ -0,0 +1,35 @@
+from recipes.models import Ingredient
+
+URL = "/api/ingredients/autocomplete/"
+
+
+def names(response):
+    return [ingredient["name"] for ingredient in response.json()]
+
+
+def test_prefix_matches_go_before_substring_matches(anon_client, dataset):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit="г")
+        for name in ("Сок яблочный", "Яблоко", "варенье яблочное")
+    )
+    response = anon_client.get(URL, {"name": "ЯБЛ"})
+    assert response.status_code == 200
+    assert names(response) == ["Яблоко", "варенье яблочное", "Сок яблочный"]
+
+
+def test_results_are_capped(anon_client, dataset):
+    response = anon_client.get(URL, {"name": "ингредиент", "limit": 1000})
+    assert len(response.json()) == 50
+    assert len(anon_client.get(URL, {"name": "ингредиент"}).json()) == 10
+
+
+def test_empty_query_returns_nothing(anon_client, dataset):
+    assert anon_client.get(URL).json() == []
+
+
+def test_index_is_rebuilt_after_change(anon_client, query_budget, dataset):
+    assert names(anon_client.get(URL, {"name": "абрикос"})) == []
+    with query_budget(0, f"GET {URL} (индекс построен)"):
+        anon_client.get(URL, {"name": "абрикос"})
+    Ingredient.objects.create(name="абрикос", measurement_unit="г")
+    assert names(anon_client.get(URL, {"name": "абрикос"})) == ["абрикос"]
@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.models import Ingredient
+
+
+def load(path):
+    call_command("load_ingredients", file=str(path), stdout=io.StringIO())
+
+
+def test_load_ingredients_from_json(tmp_path, db):
+    path = tmp_path / "ingredients.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "Соль поваренная", "measurement_unit": "г"},
+                {"name": "Сахар тростниковый", "measurement_unit": "г"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    load(path)
+    assert Ingredient.objects.filter(
+        name__in=("Соль поваренная", "Сахар тростниковый")).count() == 2
+
+
+@pytest.mark.parametrize(
+    "item", ("соль", {"name": "Соль"}, {"name": 1, "measurement_unit": "г"})
+)
+def test_invalid_json_item_is_reported(tmp_path, db, item):
+    path = tmp_path / "ingredients.json"
+    path.write_text(
+        json.dumps([{"name": "Перец", "measurement_unit": "г"}, item]),
+        encoding="utf-8",
+    )
+    with pytest.raises(CommandError, match="Элемент 1 "):
+        load(path)
@@ -0,0 +1,64 @@
+from recipes.models import CompositionOfDish, Recipe
+from recipes.pantry import PantryIndex
+
+PANTRY_URL = "/api/recipes/pantry/"
+
+
+def recipe_ingredients(recipe_id):
+    return list(
+        CompositionOfDish.objects.filter(recipe_id=recipe_id)
+        .values_list("ingredient_id", flat=True)
+    )
+
+
+def test_pantry_index_ranking():
+    index = PantryIndex()
+    index.load(
+        [(1, 30), (2, 10), (3, 20), (4, 5)],
+        [(1, 10), (1, 11), (2, 10), (2, 12), (3, 10), (3, 11), (4, 13)],
+    )
+    assert index.search([10, 11], 10) == [(3, 0), (1, 0), (2, 1)]
+    assert index.search([10, 11], 10, max_missing=0) == [(3, 0), (1, 0)]
+    index.remove(3)
+    index.add(3, 20, [12])
+    assert index.search([10, 11], 10) == [(1, 0), (2, 1)]
+    assert index.search([12], 1) == [(3, 0)]
+
+
+def test_pantry_endpoint(reader_client, query_budget, dataset):
+    ingredients = recipe_ingredients(dataset.recipe_id)
+    url = f"{PANTRY_URL}?ingredients={','.join(map(str, ingredients))}"
+    reader_client.get(url)
+    # Авторизация, страница рецептов, теги, состав блюда.
+    with query_budget(4, f"GET {url}"):
+        data = reader_client.get(url).json()
+    results = data["results"]
+    assert dataset.recipe_id in [
+        recipe["id"] for recipe in results if
+        recipe["missing_ingredients"] == 0]
+    missing = [recipe["missing_ingredients"] for recipe in results]
+    assert missing == sorted(missing)
+
+
+def test_pantry_follows_recipe_changes(reader_client, dataset):
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    ingredients = recipe_ingredients(recipe.id)
+    url = f"{PANTRY_URL}?max_missing=0"
+    for ingredient_id in ingredients:
+        url += f"&ingredients={ingredient_id}"
+    assert recipe.id in [
+        item["id"] for item in reader_client.get(url).json()["results"]]
+    CompositionOfDish.objects.filter(
+        recipe=recipe, ingredient_id=ingredients[0]).delete()
+    recipe.ingredients.add(
+        CompositionOfDish.objects.exclude(
+            ingredient_id__in=ingredients).first().ingredient)
+    assert recipe.id not in [
+        item["id"] for item in reader_client.get(url).json()["results"]]
+
+
+def test_pantry_validation(anon_client):
+    assert anon_client.get(PANTRY_URL).status_code == 400
+    assert anon_client.get(f"{PANTRY_URL}?ingredients=a").status_code == 400
+    response = anon_client.get(f"{PANTRY_URL}?ingredients=1&max_missing=-1")
+    assert response.status_code == 400
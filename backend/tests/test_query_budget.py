@@ -0,0 +1,131 @@
+"""Бюджеты SQL-запросов для эндпоинтов роутера api/urls.py.
+Бюджет не зависит от размера страницы: рост числа запросов вместе
+с limit означает регрессию N+1. В бюджет входит один запрос
+на проверку токена для авторизованного клиента и обращения к таблице
+кэша: версии справочников (CACHE_READ на каждую), чтение и запись
+количества объектов страницы (CACHE_READ + CACHE_WRITE)."""
+
+import pytest
+
+from tests.conftest import CACHE_READ, CACHE_WRITE
+
+PAGE_SIZES = (6, 100)
+# Количество объектов страницы: прочитать из кэша и записать в кэш.
+COUNT_CACHE = CACHE_READ + CACHE_WRITE
+# Версии справочников тегов и ингредиентов для представления рецептов.
+CATALOGUE_VERSIONS = 2 * CACHE_READ
+
+
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+@pytest.mark.parametrize(
+    "client_name, budget",
+    (
+        ("anon_client", 4 + COUNT_CACHE + CATALOGUE_VERSIONS),
+        ("reader_client", 5 + COUNT_CACHE + CATALOGUE_VERSIONS),
+    ),
+)
+def test_recipe_list(request, query_budget, dataset, client_name, budget,
+                     limit):
+    client = request.getfixturevalue(client_name)
+    url = f"/api/recipes/?limit={limit}"
+    with query_budget(budget, f"GET {url}"):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == limit
+
+
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+@pytest.mark.parametrize(
+    "params, budget",
+    (
+        ("is_favorited=1", 5 + COUNT_CACHE + CATALOGUE_VERSIONS),
+        ("is_in_shopping_cart=1", 5 + COUNT_CACHE + CATALOGUE_VERSIONS),
+        # Фильтры по тегам и автору проверяют значения отдельным запросом.
+        ("tags={tag_slug}", 6 + COUNT_CACHE + CATALOGUE_VERSIONS),
+        ("author={author_id}", 6 + COUNT_CACHE + CATALOGUE_VERSIONS),
+    ),
+)
+def test_recipe_list_filtered(reader_client, query_budget, dataset, params,
+                              budget, limit):
+    url = (
+        f"/api/recipes/?limit={limit}&"
+        f"{params.format(**vars(dataset))}"
+    )
+    with query_budget(budget, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+    assert response.json()["results"]
+
+
+def test_recipe_detail(reader_client, query_budget, dataset):
+    url = f"/api/recipes/{dataset.recipe_id}/"
+    with query_budget(4 + CATALOGUE_VERSIONS, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+def test_user_list(reader_client, query_budget, limit):
+    url = f"/api/users/?limit={limit}"
+    with query_budget(3 + COUNT_CACHE, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == limit
+
+
+def test_user_detail(reader_client, query_budget, dataset):
+    url = f"/api/users/{dataset.author_id}/"
+    with query_budget(2, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+
+
+def test_user_me(reader_client, query_budget):
+    with query_budget(2, "GET /api/users/me/"):
+        response = reader_client.get("/api/users/me/")
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+def test_user_subscriptions(reader_client, query_budget, limit):
+    url = f"/api/users/subscriptions/?limit={limit}&recipes_limit=3"
+    with query_budget(4 + COUNT_CACHE, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == limit
+
+
+@pytest.mark.parametrize(
+    "url",
+    (
+        "/api/tags/",
+        "/api/tags/{tag_id}/",
+        "/api/ingredients/?name=ингредиент 01",
+        "/api/ingredients/{ingredient_id}/",
+    ),
+)
+def test_reference_data(reader_client, query_budget, dataset, url):
+    url = url.format(**vars(dataset))
+    # Токен, версия справочника, сам справочник.
+    with query_budget(2 + CACHE_READ, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+
+
+def test_download_shopping_cart(reader_client, query_budget):
+    url = "/api/recipes/download_shopping_cart/"
+    # Версия корзины создается при первом обращении, готовый файл
+    # читается из кэша и записывается в него.
+    with query_budget(
+        2 + 2 * CACHE_READ + 2 * CACHE_WRITE, f"GET {url}"
+    ):
+        response = reader_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+def test_shopping_list_exports(reader_client, query_budget, limit):
+    url = f"/api/shopping_list_exports/?limit={limit}"
+    with query_budget(3 + COUNT_CACHE, f"GET {url}"):
+        response = reader_client.get(url)
+    assert response.status_code == 200
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management import call_command
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeActivity, RecipeRanking
+from recipes.rankings import refresh_rankings
+from tests.conftest import CACHE_READ, CACHE_WRITE
+from users.models import User
+
+RECIPES_URL = "/api/recipes/"
+
+
+def fresh_recipes(dataset, count):
+    return list(
+        Recipe.objects.exclude(favorites__user_id=dataset.reader_id)
+        .exclude(shoppingcart__user_id=dataset.reader_id)
+        .order_by("id")[:count]
+    )
+
+
+def other_user(recipe, dataset):
+    """Пользователь, у которого рецепта еще нет в избранном."""
+
+    return (
+        User.objects.exclude(id=dataset.reader_id)
+        .exclude(favorites__recipe=recipe)
+        .first()
+    )
+
+
+def first_ids(client, ordering, count):
+    data = client.get(f"{RECIPES_URL}?ordering={ordering}").json()
+    return [recipe["id"] for recipe in data["results"][:count]]
+
+
+def test_popular_ordering(reader_client, anon_client, dataset):
+    call_command("refresh_rankings", "--rebuild", "--once")
+    recipe = fresh_recipes(dataset, 1)[0]
+    top = Recipe.objects.order_by("-favorites_count", "-pub_date").first()
+    for _ in range(top.favorites_count + 1 - recipe.favorites_count):
+        recipe.favorites.create(user=other_user(recipe, dataset))
+    refresh_rankings()
+    assert first_ids(anon_client, "popular", 1) == [recipe.id]
+
+
+def test_migration_fills_popular(db, dataset):
+    migration = import_module("recipes.migrations.0009_recipe_rankings")
+    RecipeRanking.objects.all().delete()
+    migration.fill_popular(apps, None)
+    favorited = Recipe.objects.filter(favorites_count__gt=0)
+    assert dict(
+        RecipeRanking.objects.values_list("recipe_id", "popular")
+    ) == dict(favorited.values_list("id", "favorites_count"))
+
+
+def test_trending_ordering_decays(reader_client, anon_client, dataset):
+    old, new = fresh_recipes(dataset, 2)
+    for _ in range(3):
+        old.favorites.create(user=other_user(old, dataset))
+    RecipeActivity.objects.update(
+        created=timezone.now() - timedelta(days=5))
+    refresh_rankings()
+    reader_client.post(f"{RECIPES_URL}{new.id}/favorite/")
+    refresh_rankings()
+    assert first_ids(anon_client, "trending", 2) == [new.id, old.id]
+    assert not RecipeActivity.objects.exists()
+
+
+def test_removal_lowers_trending(reader_client, dataset):
+    kept, removed = fresh_recipes(dataset, 2)
+    for recipe in (kept, removed):
+        reader_client.post(f"{RECIPES_URL}{recipe.id}/favorite/")
+        reader_client.post(f"{RECIPES_URL}{recipe.id}/shopping_cart/")
+    refresh_rankings()
+    reader_client.delete(f"{RECIPES_URL}{removed.id}/shopping_cart/")
+    refresh_rankings()
+    rankings = RecipeRanking.objects.in_bulk([kept.id, removed.id])
+    assert rankings[removed.id].trending < rankings[kept.id].trending
+    reader_client.delete(f"{RECIPES_URL}{removed.id}/favorite/")
+    refresh_rankings()
+    rankings[removed.id].refresh_from_db()
+    assert rankings[removed.id].trending is None
+
+
+def test_refresh_touches_only_active_recipes(reader_client, dataset):
+    recipe = fresh_recipes(dataset, 1)[0]
+    reader_client.post(f"{RECIPES_URL}{recipe.id}/shopping_cart/")
+    assert refresh_rankings() == 1
+    assert list(RecipeRanking.objects.values_list("recipe_id", flat=True)) \
+        == [recipe.id]
+
+
+def test_invalid_ordering(anon_client):
+    assert anon_client.get(f"{RECIPES_URL}?ordering=bad").status_code == 400
+
+
+def test_ordered_list_budget(anon_client, query_budget, dataset):
+    url = f"{RECIPES_URL}?ordering=trending&limit=100"
+    # Количество - из кэша с записью в кэш, версии двух справочников.
+    with query_budget(4 + 3 * CACHE_READ + CACHE_WRITE, f"GET {url}"):
+        assert anon_client.get(url).status_code == 200
@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import CompositionOfDish, Ingredient
+
+RECIPES_URL = "/api/recipes/"
+IMAGE = (
+    "data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAA"
+    "LAAAAAABAAEAAAICRAEAOw=="
+)
+
+
+def recipe_payload(dataset, ingredients):
+    return {
+        "tags": [dataset.tag_id],
+        "ingredients": [
+            {"id": ingredient_id, "amount": amount}
+            for ingredient_id, amount in ingredients
+        ],
+        "name": "Рецепт",
+        "text": "Описание",
+        "cooking_time": 10,
+        "image": IMAGE,
+    }
+
+
+def save_queries(client, method, url, payload):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, payload, format="json")
+    assert response.status_code in (200, 201), response.json()
+    return response, len(context.captured_queries)
+
+
+def composition(recipe_id):
+    return dict(
+        CompositionOfDish.objects.filter(recipe_id=recipe_id)
+        .values_list("ingredient_id", "id")
+    )
+
+
+def test_recipe_save_queries_do_not_grow_with_ingredients(reader_client,
+                                                          dataset):
+    ingredient_ids = list(
+        Ingredient.objects.values_list("id", flat=True)[:30])
+    _, one = save_queries(
+        reader_client, "post", RECIPES_URL,
+        recipe_payload(dataset, [(ingredient_ids[0], 1)]),
+    )
+    _, many = save_queries(
+        reader_client, "post", RECIPES_URL,
+        recipe_payload(dataset, [(pk, 1) for pk in ingredient_ids]),
+    )
+    assert many <= one
+
+
+def test_recipe_update_changes_only_diff(reader_client, dataset):
+    ingredient_ids = list(
+        Ingredient.objects.values_list("id", flat=True)[:4])
+    response, _ = save_queries(
+        reader_client, "post", RECIPES_URL,
+        recipe_payload(dataset, [(pk, 1) for pk in ingredient_ids[:3]]),
+    )
+    recipe_id = response.json()["id"]
+    before = composition(recipe_id)
+
+    response, _ = save_queries(
+        reader_client, "patch", f"{RECIPES_URL}{recipe_id}/",
+        recipe_payload(
+            dataset,
+            [(ingredient_ids[0], 1), (ingredient_ids[1], 5),
+             (ingredient_ids[3], 2)],
+        ),
+    )
+    after = composition(recipe_id)
+    assert set(after) == {
+        ingredient_ids[0], ingredient_ids[1], ingredient_ids[3]}
+    assert after[ingredient_ids[0]] == before[ingredient_ids[0]]
+    assert after[ingredient_ids[1]] == before[ingredient_ids[1]]
+    amounts = {
+        item["id"]: item["amount"] for item in response.json()["ingredients"]
+    }
+    assert amounts[ingredient_ids[1]] == 5
+
+
+def test_recipe_with_unknown_ingredient_is_rejected(reader_client, dataset):
+    response = reader_client.post(
+        RECIPES_URL,
+        recipe_payload(dataset, [(dataset.ingredient_id, 1), (10 ** 6, 1)]),
+        format="json",
+    )
+    assert response.status_code == 400
+    assert str(10 ** 6) in response.json()["ingredients"][0]
@@ -0,0 +1,67 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from api import representation
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+from users.models import User
+
+RECIPES_URL = "/api/recipes/"
+
+
+def test_recipe_list_uses_representation_cache(reader_client, query_budget):
+    first = reader_client.get(RECIPES_URL).json()
+    # count, страница рецептов с флагами, авторизация. Теги и состав
+    # блюда берутся из кэша представлений.
+    with query_budget(3, f"GET {RECIPES_URL} (повторно)"):
+        second = reader_client.get(RECIPES_URL).json()
+    assert second == first
+
+
+def test_cached_representation_has_user_flags(
+    anon_client, reader_client, dataset
+):
+    url = f"{RECIPES_URL}{dataset.recipe_id}/"
+    anonymous = anon_client.get(url).json()
+    reader = reader_client.get(url).json()
+    assert anonymous["is_favorited"] is False
+    assert reader["is_favorited"] is True
+    assert reader["image"] == anonymous["image"]
+    assert reader["image"].startswith("http://testserver/")
+    assert {**reader, "is_favorited": False, "is_in_shopping_cart": False,
+            "author": anonymous["author"]} == anonymous
+
+
+def test_author_profile_change_updates_representation(anon_client, dataset):
+    url = f"{RECIPES_URL}{dataset.recipe_id}/"
+    anon_client.get(url)
+    User.objects.filter(id=dataset.author_id).update(first_name="Новое")
+    assert anon_client.get(url).json()["author"]["first_name"] == "Новое"
+
+
+def test_shared_representation_keeps_author_untouched(db, dataset):
+    request = RequestFactory().get(RECIPES_URL)
+    request.user = AnonymousUser()
+    recipe = Recipe.objects.select_related("author").get(id=dataset.recipe_id)
+    data = RecipeReadSerializer(
+        context={"request": request}).shared_representation(recipe)
+    assert data["author"]["is_subscribed"] is False
+    assert not hasattr(recipe.author, "is_subscribed")
+
+
+@pytest.mark.parametrize("url", (RECIPES_URL, f"{RECIPES_URL}{{recipe_id}}/"))
+def test_catalogue_versions_are_read_once(anon_client, dataset, monkeypatch,
+                                          url):
+    keys = []
+
+    def get_catalogue_version(key):
+        keys.append(key)
+        return "version"
+
+    monkeypatch.setattr(
+        representation, "get_catalogue_version", get_catalogue_version)
+    anon_client.get(url.format(recipe_id=dataset.recipe_id))
+    assert sorted(keys) == sorted(
+        (representation.TAGS_VERSION_KEY,
+         representation.INGREDIENTS_VERSION_KEY))
@@ -0,0 +1,33 @@
+from recipes.models import Recipe
+from tests.conftest import CACHE_READ, CACHE_WRITE
+
+RECIPES_URL = "/api/recipes/"
+
+
+def search_ids(client, query):
+    data = client.get(RECIPES_URL, {"search": query, "limit": 100}).json()
+    return [recipe["id"] for recipe in data["results"]]
+
+
+def test_search_by_name_and_text(anon_client, dataset):
+    by_name = Recipe.objects.get(id=dataset.recipe_id)
+    by_name.name = "Борщ украинский"
+    by_name.save()
+    by_text = Recipe.objects.exclude(id=dataset.recipe_id).first()
+    by_text.text = "Наваристый Борщ со сметаной"
+    by_text.save()
+    # SQLite сравнивает без учета регистра только латиницу.
+    assert search_ids(anon_client, "Борщ") == [by_name.id, by_text.id]
+    assert search_ids(anon_client, "Борщ сметан") == [by_text.id]
+
+
+def test_empty_search_returns_all(anon_client, dataset):
+    data = anon_client.get(RECIPES_URL, {"search": " "}).json()
+    assert data["count"] == Recipe.objects.count()
+
+
+def test_search_budget(reader_client, query_budget, dataset):
+    url = f"{RECIPES_URL}?search=Рецепт&limit=100"
+    # Количество - из кэша с записью в кэш, версии двух справочников.
+    with query_budget(5 + 3 * CACHE_READ + CACHE_WRITE, f"GET {url}"):
+        assert reader_client.get(url).status_code == 200
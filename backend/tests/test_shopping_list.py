@@ -0,0 +1,124 @@
+import importlib
+import io
+import re
+
+import pytest
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from recipes.exports import EXPORT_TTL
+from recipes.models import CompositionOfDish, ShoppingCart, ShoppingListExport
+from recipes.shopping_list import (CART_VERSION_KEY, bump_cart_versions,
+                                   get_cart_version)
+from tests.conftest import CACHE_READ
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+def test_repeat_download_is_served_from_cache(reader_client, query_budget):
+    first = b"".join(reader_client.get(URL).streaming_content)
+    # Токен, версия корзины и готовый файл из кэша.
+    with query_budget(1 + 2 * CACHE_READ, f"GET {URL} (повторно)"):
+        second = reader_client.get(URL)
+    assert second.status_code == 200
+    assert b"".join(second.streaming_content) == first
+
+
+def test_cart_change_bumps_version(reader_client, dataset):
+    version = get_cart_version(dataset.reader_id)
+    ShoppingCart.objects.create(
+        user_id=dataset.reader_id, recipe_id=dataset.recipe_id)
+    assert get_cart_version(dataset.reader_id) != version
+
+
+def test_composition_change_bumps_version(reader_client, dataset):
+    version = get_cart_version(dataset.reader_id)
+    composition = CompositionOfDish.objects.filter(
+        recipe__shoppingcart__user_id=dataset.reader_id).first()
+    composition.amount += 100
+    composition.save()
+    assert get_cart_version(dataset.reader_id) != version
+
+
+def test_recipe_update_bumps_version(reader_client, dataset):
+    recipe = ShoppingCart.objects.filter(
+        user_id=dataset.reader_id).first().recipe
+    version = get_cart_version(dataset.reader_id)
+    recipe.ingredients.clear()
+    assert get_cart_version(dataset.reader_id) != version
+
+
+def test_default_cache_is_shared_between_processes(monkeypatch):
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+    project_settings = importlib.reload(
+        importlib.import_module("foodgram.settings"))
+    assert project_settings.CACHES["default"]["BACKEND"] == (
+        "django.core.cache.backends.db.DatabaseCache")
+
+
+def test_cart_version_is_read_from_shared_cache(reader_client, dataset):
+    # Отдельное подключение к кэшу, как в другом процессе gunicorn.
+    other = caches.create_connection("default")
+    key = CART_VERSION_KEY.format(user_id=dataset.reader_id)
+    version = get_cart_version(dataset.reader_id)
+    assert other.get(key) == version
+    bump_cart_versions([dataset.reader_id])
+    assert other.get(key) == get_cart_version(dataset.reader_id) != version
+
+
+def test_long_shopping_list_is_paginated(reader_client):
+    response = reader_client.get(URL)
+    content = b"".join(response.streaming_content)
+    assert response["Content-Type"] == "application/pdf"
+    assert len(re.findall(rb"/Type /Page\b(?!s)", content)) > 1
+
+
+def test_background_export(reader_client):
+    response = reader_client.post("/api/shopping_list_exports/")
+    assert response.status_code == 202
+    export_url = f"/api/shopping_list_exports/{response.json()['id']}/"
+    assert reader_client.get(f"{export_url}download/").status_code == 409
+
+    call_command(
+        "run_export_worker", "--workers=1", "--once", stdout=io.StringIO())
+
+    export = reader_client.get(export_url).json()
+    assert export["status"] == "done"
+    response = reader_client.get(f"{export_url}download/")
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content).startswith(b"%PDF")
+
+
+def test_old_exports_are_cleaned(reader_client):
+    export_id = reader_client.post("/api/shopping_list_exports/").json()["id"]
+    call_command(
+        "run_export_worker", "--workers=1", "--once", stdout=io.StringIO())
+    call_command("clean_exports", stdout=io.StringIO())
+    export = ShoppingListExport.objects.get(id=export_id)
+    assert default_storage.exists(export.file.name)
+
+    ShoppingListExport.objects.filter(id=export_id).update(
+        finished=timezone.now() - EXPORT_TTL)
+    call_command("clean_exports", stdout=io.StringIO())
+    assert not ShoppingListExport.objects.filter(id=export_id).exists()
+    assert not default_storage.exists(export.file.name)
+
+
+@pytest.mark.parametrize(
+    "query, accept, content_type",
+    (
+        ("?format=csv", "*/*", "text/csv; charset=utf-8"),
+        ("?format=txt", "*/*", "text/plain; charset=utf-8"),
+        ("", "application/json", "application/json"),
+    ),
+)
+def test_shopping_list_formats(reader_client, query_budget, query, accept,
+                               content_type):
+    with query_budget(2, f"GET {URL}{query}"):
+        response = reader_client.get(f"{URL}{query}", HTTP_ACCEPT=accept)
+    assert response.status_code == 200
+    assert response["Content-Type"] == content_type
+    assert "attachment" in response["Content-Disposition"]
+    assert "ингредиент" in response.content.decode()
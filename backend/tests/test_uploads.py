@@ -0,0 +1,81 @@
+import io
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, RecipeImageUpload, User
+from tests.test_recipe_save import RECIPES_URL, recipe_payload
+
+UPLOAD_URL = f"{RECIPES_URL}upload_image/"
+
+
+def image_bytes(size=(800, 600)):
+    output = io.BytesIO()
+    Image.effect_noise(size, 64).convert("RGB").save(output, "JPEG")
+    return output.getvalue()
+
+
+def test_multipart_upload_is_used_by_recipe(reader_client, dataset,
+                                            settings):
+    # Файл больше порога пишется во временный файл, а не в память.
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 1024
+    content = image_bytes()
+    response = reader_client.post(
+        UPLOAD_URL,
+        {"image": SimpleUploadedFile("photo.jpg", content, "image/jpeg")},
+        format="multipart",
+    )
+    assert response.status_code == 201
+    upload = response.json()
+    assert upload["handle"] == f"upload:{upload['id']}"
+    name = RecipeImageUpload.objects.get(id=upload["id"]).image.name
+
+    payload = recipe_payload(dataset, [(dataset.ingredient_id, 1)])
+    payload["image"] = upload["handle"]
+    response = reader_client.post(RECIPES_URL, payload, format="json")
+    assert response.status_code == 201
+    recipe = Recipe.objects.get(id=response.json()["id"])
+    assert recipe.image.name == name
+    with default_storage.open(name) as file:
+        assert file.read() == content
+    assert not RecipeImageUpload.objects.filter(id=upload["id"]).exists()
+
+    response = reader_client.post(RECIPES_URL, payload, format="json")
+    assert response.status_code == 400
+    assert "image" in response.json()
+
+
+def test_raw_body_upload(reader_client):
+    response = reader_client.post(
+        UPLOAD_URL,
+        image_bytes(),
+        content_type="image/jpeg",
+        HTTP_CONTENT_DISPOSITION="attachment; filename=photo.jpg",
+    )
+    assert response.status_code == 201
+    assert response.json()["handle"].startswith("upload:")
+
+
+def test_upload_rejects_non_image(reader_client):
+    response = reader_client.post(
+        UPLOAD_URL,
+        {"image": SimpleUploadedFile("photo.jpg", b"not an image")},
+        format="multipart",
+    )
+    assert response.status_code == 400
+
+
+def test_upload_handle_of_another_user_is_rejected(reader_client, dataset):
+    handle = reader_client.post(
+        UPLOAD_URL,
+        {"image": SimpleUploadedFile("photo.jpg", image_bytes())},
+        format="multipart",
+    ).json()["handle"]
+    client = APIClient()
+    client.force_authenticate(User.objects.get(id=dataset.author_id))
+    payload = recipe_payload(dataset, [(dataset.ingredient_id, 1)])
+    payload["image"] = handle
+    response = client.post(RECIPES_URL, payload, format="json")
+    assert response.status_code == 400
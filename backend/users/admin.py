@@ -20,7 +20,8 @@ class UsersAdmin(BaseAdminSettings):
         "username",
         "email",
         "first_name",
-        "last_name"
+        "last_name",
+        "recipes_count",
     )
     list_display_links = ("id", "username")
     search_fields = ("username", "role")
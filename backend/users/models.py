@@ -59,6 +59,10 @@ class User(AbstractUser):
         default=RoleChoises.USER,
         max_length=LenghtField.MAX_LENGHT_ROLE.value,
     )
+    # Поддерживается сигналами приложения recipes (recipes.counters).
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов", default=0, editable=False
+    )
 
     class Meta:
         verbose_name = "Пользователь"
@@ -4,6 +4,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from drf_extra_fields.fields import Base64ImageField
 
+from api.fields import ImageVariantsField
 from recipes.models import Recipe
 from users.models import User, Subscriptions
 
@@ -13,6 +14,7 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     image позволяет передавать изображения в виде base64-строки по API."""
 
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -20,6 +22,7 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         )
 
@@ -47,6 +50,10 @@ class MyUserSerializer(UserSerializer):
         """Проверка подписки пользователей.
         Определяет - подписан ли текущий пользователь
         на просматриваемого пользователя."""
+        is_subscribed = getattr(
+            obj, "is_subscribed", self.context.get("is_subscribed"))
+        if is_subscribed is not None:
+            return is_subscribed
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -95,26 +102,33 @@ class UserSubscriptionsSerializer(serializers.ModelSerializer):
         Определяет - подписан ли текущий пользователь
         на просматриваемого пользователя."""
 
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
         return Subscriptions.objects.filter(user=user, author=obj).exists()
 
     def get_recipes_count(self, author):
-        """Количество рецептов, связанных с текущим автором."""
+        """Количество рецептов, связанных с текущим автором.
+        Счетчик User.recipes_count поддерживается сигналами."""
 
-        return author.recipes.count()
+        return author.recipes_count
 
     def get_recipes(self, author):
-        """Получить количество рецептов для данного автора."""
-
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        recipes = (
-            author.recipes.all()[: int(limit)]
-            if limit
-            else author.recipes.all()
-        )
+        """Получить рецепты данного автора. Берутся из recipes_preview,
+        если они заранее подгружены для всей страницы."""
+
+        recipes = getattr(author, "recipes_preview", None)
+        if recipes is None:
+            request = self.context.get("request")
+            limit = request.GET.get("recipes_limit")
+            recipes = (
+                author.recipes.all()[: int(limit)]
+                if limit
+                else author.recipes.all()
+            )
         serializer = ShortRecipeSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
@@ -1,4 +1,13 @@
+from collections import defaultdict
+
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Value,
+)
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
@@ -8,8 +17,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from api.filters import FilterUser
-from api.pagination import PaginationCust
+from api.pagination import PaginationCust, SubscriptionsPagination
 from api.permissions import IsAdminOrReadOnly
+from recipes.models import Recipe
 from users.models import User, Subscriptions
 from users.serializers import MyUserSerializer, UserSubscriptionsSerializer
 
@@ -27,6 +37,21 @@ class CustomUserViewSet(UserViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = PaginationCust
 
+    def get_queryset(self):
+        """Пользователи с флагом подписки текущего пользователя,
+        посчитанным подзапросом EXISTS для всей страницы."""
+
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscriptions.objects.filter(user=user, author=OuterRef("pk"))
+            )
+        )
+
     @action(detail=True, methods=["post"],
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, **kwargs):
@@ -58,16 +83,50 @@ class CustomUserViewSet(UserViewSet):
                 "Подписка не существует", status=status.HTTP_400_BAD_REQUEST
             )
 
+    @staticmethod
+    def get_recipes_limit(request):
+        """Параметр recipes_limit из запроса. Некорректное
+        или неположительное значение означает отсутствие лимита."""
+
+        try:
+            limit = int(request.query_params.get("recipes_limit", ""))
+        except ValueError:
+            return None
+        return limit if limit > 0 else None
+
+    @staticmethod
+    def attach_recipes_preview(authors, limit):
+        """Подгружает рецепты для всех авторов страницы одним запросом
+        и раскладывает их по авторам в атрибут recipes_preview."""
+
+        author_ids = [author.id for author in authors]
+        recipes = (
+            Recipe.objects.latest_for_authors(author_ids, limit)
+            if limit
+            else Recipe.objects.filter(author__in=author_ids)
+        )
+        previews = defaultdict(list)
+        for recipe in recipes:
+            previews[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipes_preview = previews[author.id]
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated],
+        pagination_class=SubscriptionsPagination,
     )
     def subscriptions(self, request):
         """Просмотр подписок на авторов.Мои подписки."""
 
-        pages = self.paginate_queryset(
-            User.objects.filter(subscribe__user=request.user)
-        )
+        queryset = User.objects.filter(
+            subscribe__user=request.user
+        ).annotate(
+            subscription_id=F("subscribe__id"),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by("-subscription_id")
+        pages = self.paginate_queryset(queryset)
+        self.attach_recipes_preview(pages, self.get_recipes_limit(request))
         serializer = UserSubscriptionsSerializer(
             pages, many=True, context={"request": request}
         )